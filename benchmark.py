@@ -0,0 +1,358 @@
+"""Repeatable CPU benchmark of the detection pipeline on the bundled dataset.
+
+    python benchmark.py                      # val split, every mode
+    python benchmark.py --split all --copies 4 --modes roi,multiprocess
+
+The labelled page images in datasets/data/images/<split> are bound into one
+synthetic PDF per book (pages in page order), then every mode is run on
+those PDFs in a fresh process so peak memory is per mode. Each mode
+records pages/s, per-stage p50/p95 latencies, peak RSS and accuracy against
+the YOLO label files:
+
+    detection_recall   labelled pages whose detected box overlaps a label (IoU >= 0.5)
+    read_rate          labelled pages where a page number was read
+    false_detections   unlabelled pages where a box was still detected
+
+The GUI's cold start is measured too (PageDetect.py --measure-startup on
+Qt's offscreen platform): seconds from launching the interpreter to the
+window's first paint, and to the models being loaded.
+
+Results go to benchmarks/results/<timestamp>.json and are compared with the
+previous run, flagging modes whose throughput or recall dropped and a
+slower first paint.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+# CPU only, also for the worker processes, which inherit the environment.
+os.environ['CUDA_VISIBLE_DEVICES'] = ''
+
+import fitz
+
+
+DATASET_DIR = os.path.join("datasets", "data")
+OUTPUT_DIR = "benchmarks"
+# Synthetic pages are A4 wide; the height follows the image.
+PAGE_WIDTH_PTS = 595
+IOU_THRESHOLD = 0.5
+# Relative drop against the previous run that counts as a regression.
+REGRESSION_TOLERANCE = 0.10
+# First paint is short and noisy; it must also be this much slower (s).
+STARTUP_TOLERANCE = 0.1
+
+# name: settings. ROI is the margin-band mode on a two-resolution proxy.
+MODES = {
+    'sequential': {'batch_size': 1, 'workers': 1, 'detect_dpi': None, 'band_fraction': None, 'cache': False},
+    'batched': {'batch_size': 8, 'workers': 1, 'detect_dpi': None, 'band_fraction': None, 'cache': False},
+    'two_resolution': {'batch_size': 8, 'workers': 1, 'detect_dpi': 72, 'band_fraction': None, 'cache': False},
+    'roi': {'batch_size': 8, 'workers': 1, 'detect_dpi': 72, 'band_fraction': 0.12, 'cache': False},
+    'multiprocess': {'batch_size': 8, 'workers': None, 'detect_dpi': 72, 'band_fraction': 0.12, 'cache': False},
+    'cached': {'batch_size': 8, 'workers': 1, 'detect_dpi': 72, 'band_fraction': 0.12, 'cache': True},
+}
+
+
+def book_pages(split):
+    """{book: [(page_label, image_path, label_path)]} for a dataset split, in page order."""
+    books = {}
+    splits = ['train', 'val'] if split == 'all' else [split]
+    for name in splits:
+        for image_path in glob.glob(os.path.join(DATASET_DIR, "images", name, "*")):
+            stem = os.path.splitext(os.path.basename(image_path))[0]
+            match = re.match(r'(.+?)_page_(\d+)$', stem)
+            if not match:
+                continue
+            label_path = os.path.join(DATASET_DIR, "labels", name, stem + ".txt")
+            books.setdefault(match.group(1), []).append((int(match.group(2)), image_path, label_path))
+    return {book: sorted(pages) for book, pages in sorted(books.items())}
+
+
+def read_labels(label_path, width, height):
+    """YOLO label boxes as [x0, y0, x1, y1] in PDF points on a width x height page."""
+    boxes = []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            for line in f:
+                values = line.split()
+                if len(values) != 5:
+                    continue
+                xc, yc, w, h = map(float, values[1:])
+                boxes.append([(xc - w / 2) * width, (yc - h / 2) * height,
+                              (xc + w / 2) * width, (yc + h / 2) * height])
+    return boxes
+
+
+def build_pdfs(split, pdf_dir, copies=1):
+    """Write one PDF per book plus ground_truth.json; reused when already built."""
+    truth_path = os.path.join(pdf_dir, "ground_truth.json")
+    if os.path.exists(truth_path):
+        return truth_path
+    os.makedirs(pdf_dir, exist_ok=True)
+    truth = {}
+    for book, pages in book_pages(split).items():
+        pdf_name = f"{book}.pdf"
+        doc = fitz.open()
+        truth[pdf_name] = {}
+        for _ in range(copies):
+            for page_label, image_path, label_path in pages:
+                pixmap = fitz.Pixmap(image_path)
+                height = PAGE_WIDTH_PTS * pixmap.height / pixmap.width
+                page = doc.new_page(width=PAGE_WIDTH_PTS, height=height)
+                page.insert_image(page.rect, filename=image_path)
+                truth[pdf_name][str(page.number)] = {'image': os.path.basename(image_path),
+                                                     'boxes': read_labels(label_path, PAGE_WIDTH_PTS, height)}
+        doc.save(os.path.join(pdf_dir, pdf_name), deflate=True)
+        doc.close()
+    with open(truth_path, 'w') as f:
+        json.dump(truth, f)
+    return truth_path
+
+
+def iou(a, b):
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def accuracy(truth, journal_pages):
+    labelled = hits = read = unlabelled = false_detections = 0
+    for pdf_name, pages in truth.items():
+        for page_num, expected in pages.items():
+            entry = journal_pages.get(pdf_name, {}).get(int(page_num), {})
+            box = entry.get('box')
+            if expected['boxes']:
+                labelled += 1
+                hits += box is not None and any(iou(box, label) >= IOU_THRESHOLD for label in expected['boxes'])
+                read += bool(re.fullmatch(r'\d+|[ivxlcdm]+', entry.get('page_number', ''), re.IGNORECASE))
+            else:
+                unlabelled += 1
+                false_detections += box is not None
+    return {
+        'labelled_pages': labelled,
+        'detection_recall': hits / labelled if labelled else None,
+        'read_rate': read / labelled if labelled else None,
+        'false_detections': false_detections,
+        'unlabelled_pages': unlabelled,
+    }
+
+
+def run_mode(name, pdf_dir, model_path, workers, backend='torch'):
+    """Run one mode in this process and return its measurements."""
+    from pipeline import ModelHolder, FitzRasterizer, list_pdfs, scan_pdfs, new_counters, detection_params
+    from result_cache import ResultCache
+    from job_journal import JobJournal, read_journal
+    from stage_stats import StageStats, percentile
+
+    settings = dict(MODES[name])
+    settings['workers'] = settings['workers'] or workers
+    pdf_paths = list_pdfs(pdf_dir)
+    rasterizer = FitzRasterizer(dpi=300, detect_dpi=settings['detect_dpi'], band_fraction=settings['band_fraction'])
+    models = ModelHolder(model_path, settings['batch_size'], backend)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, "cache.sqlite")) if settings['cache'] else None
+        journal_path = os.path.join(work_dir, "journal.jsonl")
+
+        def scan(stats=None, journal=None, pdfs=pdf_paths):
+            times = []
+            for _ in scan_pdfs(pdfs, models, rasterizer, settings['workers'], thumb_size=None,
+                               counters=counters, cache=cache, journal=journal, stats=stats):
+                times.append(time.perf_counter())
+            return times
+
+        # Load the models (or start the workers) and warm the file cache
+        # before timing; the cached mode fills its cache here.
+        counters = new_counters()
+        scan(pdfs=pdf_paths if settings['cache'] else pdf_paths[:1])
+
+        counters = new_counters()
+        stats = StageStats()
+        journal = JobJournal(journal_path, detection_params(rasterizer, backend=models.backend), resume=False)
+        start = time.perf_counter()
+        times = scan(stats, journal)
+        elapsed = time.perf_counter() - start
+        journal.close()
+        models.close()
+        if cache is not None:
+            cache.close()
+
+        with open(os.path.join(pdf_dir, "ground_truth.json")) as f:
+            truth = json.load(f)
+        intervals = [b - a for a, b in zip([start] + times, times)]
+        summary = stats.summary()
+        return {
+            'settings': settings,
+            'pages': len(times),
+            'seconds': elapsed,
+            'pages_per_second': len(times) / elapsed if elapsed else None,
+            'page_interval_p50': percentile(intervals, 0.5) if intervals else None,
+            'page_interval_p95': percentile(intervals, 0.95) if intervals else None,
+            'stages': summary['stages'],
+            'gauges': summary['gauges'],
+            # Largest single process, and all processes together (multiprocess mode).
+            'peak_rss_bytes': max(summary['peak_rss'].values()) if summary['peak_rss'] else None,
+            'peak_rss_total_bytes': sum(summary['peak_rss'].values()) if summary['peak_rss'] else None,
+            'counters': counters,
+            'accuracy': accuracy(truth, read_journal(journal_path)),
+        }
+
+
+def measure_startup():
+    """Cold start of the GUI: seconds to the interpreter, the first paint and loaded models."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PageDetect.py")
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    launched = time.time()
+    completed = subprocess.run([sys.executable, script, '--measure-startup'], capture_output=True, text=True,
+                               env=env)
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+    if completed.returncode != 0 or not lines:
+        return {'error': f"exit status {completed.returncode}"}
+    timings = json.loads(lines[-1])
+    interpreter = timings['started_wall'] - launched
+    return {
+        'interpreter': interpreter,
+        'first_paint': interpreter + timings['first_paint'],
+        'models_ready': interpreter + timings['models_ready'],
+        'models_error': timings['models_error'],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(results_dir):
+    paths = sorted(glob.glob(os.path.join(results_dir, "*.json")))
+    if not paths:
+        return None
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def compare(current, previous):
+    """Print per-mode changes against the previous run; returns the regressed modes."""
+    regressions = []
+    for name, result in current['modes'].items():
+        before = previous['modes'].get(name)
+        if not before or 'error' in result or 'error' in before:
+            continue
+        speed = result['pages_per_second'] / before['pages_per_second'] - 1
+        recall_now, recall_before = result['accuracy']['detection_recall'], before['accuracy']['detection_recall']
+        recall = (recall_now - recall_before) if recall_now is not None and recall_before is not None else 0.0
+        flag = ""
+        if speed < -REGRESSION_TOLERANCE or recall < -0.01:
+            flag = "  <-- regression"
+            regressions.append(name)
+        print(f"{name:<16}{speed:>+10.1%} pages/s{recall:>+10.1%} recall{flag}")
+
+    now, before = current.get('startup', {}), previous.get('startup', {})
+    if 'first_paint' in now and 'first_paint' in before:
+        slower = now['first_paint'] - before['first_paint']
+        flag = ""
+        if slower > STARTUP_TOLERANCE and slower > REGRESSION_TOLERANCE * before['first_paint']:
+            flag = "  <-- regression"
+            regressions.append('startup')
+        print(f"{'startup':<16}{slower:>+9.2f}s first paint{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline on the bundled dataset (CPU).")
+    parser.add_argument('--split', choices=['val', 'train', 'all'], default='val')
+    parser.add_argument('--copies', type=int, default=1, help="repeat each book's pages to make longer PDFs")
+    parser.add_argument('--modes', default=','.join(MODES), help="comma-separated subset of: " + ', '.join(MODES))
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="processes for the multiprocess mode")
+    parser.add_argument('--model', default='best.pt')
+    parser.add_argument('--backend', choices=['torch', 'onnx', 'onnx-int8'], default='torch',
+                        help="YOLO inference backend")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--no-startup', action='store_true', help="skip the GUI cold-start measurement")
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--pdf-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_mode:
+        result = run_mode(args.run_mode, args.pdf_dir, args.model, args.workers, args.backend)
+        with open(args.result_file, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    modes = [name for name in args.modes.split(',') if name]
+    unknown = [name for name in modes if name not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    pdf_dir = os.path.join(args.output_dir, "pdfs", f"{args.split}_x{args.copies}")
+    build_pdfs(args.split, pdf_dir, args.copies)
+
+    report = {
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'revision': git_revision(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'split': args.split,
+        'copies': args.copies,
+        'backend': args.backend,
+        'modes': {},
+    }
+    for name in modes:
+        print(f"Running {name}...", flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            result_file = os.path.join(tmp, "result.json")
+            # A fresh interpreter per mode, so peak RSS belongs to that mode alone.
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-mode', name,
+                                        '--pdf-dir', pdf_dir, '--result-file', result_file,
+                                        '--model', args.model, '--workers', str(args.workers),
+                                        '--backend', args.backend])
+            if completed.returncode != 0 or not os.path.exists(result_file):
+                report['modes'][name] = {'error': f"exit status {completed.returncode}"}
+                continue
+            with open(result_file) as f:
+                result = report['modes'][name] = json.load(f)
+        rss = f"{result['peak_rss_bytes'] / 2**20:.0f} MB" if result['peak_rss_bytes'] else "n/a"
+        print(f"  {result['pages']} pages, {result['pages_per_second']:.2f} pages/s, "
+              f"p95 page interval {result['page_interval_p95'] * 1000:.0f} ms, peak RSS {rss}, "
+              f"recall {result['accuracy']['detection_recall']}, read rate {result['accuracy']['read_rate']}")
+
+    if not args.no_startup:
+        print("Measuring GUI start-up...", flush=True)
+        startup = report['startup'] = measure_startup()
+        if 'error' in startup:
+            print(f"  failed: {startup['error']}")
+        else:
+            print(f"  first paint {startup['first_paint']:.2f} s, models ready {startup['models_ready']:.1f} s"
+                  + (f" (failed: {startup['models_error']})" if startup['models_error'] else ""))
+
+    results_dir = os.path.join(args.output_dir, "results")
+    os.makedirs(results_dir, exist_ok=True)
+    previous = previous_result(results_dir)
+    result_path = os.path.join(results_dir, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(result_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {result_path}")
+
+    if previous is not None:
+        print(f"Compared with {previous['time']} ({previous.get('revision')}):")
+        if compare(report, previous):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import re
+
+from scan_quality import BLANK_PAGE, MIN_DPI, PAGE_KINDS
+
+
+def book_wise_results(page_results, page_dpis=None):
+    """Per-book summary from (pdf_path, page_num, page_number) rows in book order.
+
+    Returns {book_name: details}, details holding the detected and missing
+    printed page numbers, the DPI check and the pages found out of order.
+    The reads are taken as a sequence along the PDF pages: a number is only
+    missing where the count jumps by more than the pages between two reads,
+    so unread pages inside a run are no gap. A read that disagrees with
+    both neighbours, which agree with each other, is a misread rather than
+    a gap or reordering and goes to 'suspect_pages' as (PDF page, read).
+    'blank_pages' and 'plate_pages' list the PDF pages the pre-check
+    found to carry no number, 'undetected_pages' those where one was
+    expected but not read.
+    ``page_dpis`` maps a pdf_path to its per-page DPIs (scan_quality.book_dpis);
+    'all_pages_above_300dpi' is None for books not in it, 'low_dpi_pages'
+    lists the PDF pages (1-based) scanned below MIN_DPI.
+    Qt-free, so it can be built from a job journal as well as from the GUI.
+    """
+    page_dpis = page_dpis or {}
+    book_results = {}
+    reads = {}
+    for pdf_path, page_num, page_number in page_results:
+        book_name = os.path.basename(pdf_path).split('.pdf')[0]
+
+        if book_name not in book_results:
+            book_results[book_name] = {
+                'detected_pages': [],
+                'missing_pages': [],
+                'all_pages_above_300dpi': None,
+                'low_dpi_pages': [],
+                'min_dpi': None,
+                'in_order_pages': [],
+                'suspect_pages': [],
+                'blank_pages': [],
+                'plate_pages': [],
+                'undetected_pages': [],
+            }
+            reads[book_name] = []
+            dpis = page_dpis.get(pdf_path)
+            if dpis is not None:
+                known = [dpi for dpi in dpis if dpi is not None]
+                low = [page + 1 for page, dpi in enumerate(dpis) if dpi is not None and dpi < MIN_DPI]
+                book_results[book_name].update(all_pages_above_300dpi=not low, low_dpi_pages=low,
+                                               min_dpi=min(known) if known else None)
+
+        if page_number.isdigit():
+            book_results[book_name]['detected_pages'].append(int(page_number))
+            reads[book_name].append((page_num, int(page_number)))
+        elif page_number in PAGE_KINDS:
+            book_results[book_name]['blank_pages' if page_number == BLANK_PAGE else 'plate_pages'].append(page_num + 1)
+        elif page_number in ("No page number detected", "Page number found but not recognized"):
+            book_results[book_name]['undetected_pages'].append(page_num + 1)
+        else:
+            try:
+                extracted_number = re.search(r'\d+', page_number)
+                if extracted_number:
+                    book_results[book_name]['missing_pages'].append(int(extracted_number.group()))
+            except ValueError:
+                pass
+
+    for book, details in book_results.items():
+        if not details['detected_pages']:
+            continue
+        sequence, suspects = drop_misreads(reads[book])
+        details['suspect_pages'] = [(page_num + 1, number) for page_num, number in suspects]
+        detected = set(details['detected_pages'])
+
+        # Numbers before the first read that its PDF page leaves no room for.
+        first_page, first_number = sequence[0]
+        missing = set(range(1, first_number - first_page))
+        pages = []
+        for (previous_page, previous_number), (page_num, number) in zip(sequence, sequence[1:]):
+            if number <= previous_number:
+                pages.append(number)
+                continue
+            skipped = (number - previous_number) - (page_num - previous_page)
+            if skipped > 0:
+                missing.update(range(number - skipped, number))
+        details['missing_pages'] = sorted(missing - detected)
+        details['in_order_pages'] = pages
+
+    return book_results
+
+
+def drop_misreads(reads):
+    """Split (page_num, number) reads into the sequence and the misreads dropped from it.
+
+    A read is a misread when its neighbours agree with each other (their
+    numbers differ by their page distance) and it fits neither of them.
+    """
+    suspects = []
+    for before, read, after in zip(reads, reads[1:], reads[2:]):
+        if after[1] - before[1] == after[0] - before[0] and read[1] - before[1] != read[0] - before[0]:
+            suspects.append(read)
+    return [read for read in reads if read not in suspects], suspects
+
+
+def dpi_check_text(details, unknown="Unknown"):
+    """The DPI check of a book_wise_results entry as one line of text."""
+    if details['all_pages_above_300dpi'] is None:
+        return unknown
+    if not details['all_pages_above_300dpi']:
+        return (f"No: pages {', '.join(map(str, details['low_dpi_pages']))} "
+                f"(lowest {details['min_dpi']} DPI)")
+    return "Yes" if details['min_dpi'] is not None else "Yes (no scanned images)"
@@ -1,59 +1,22 @@
 import cv2
-from ultralytics import YOLO
-import easyocr
-import re
 import os
 
-class PageNumberDetector:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
-        self.ocr = easyocr.Reader(['en'])
-        self.page_number_pattern = r'\b\d+\b'
+from pipeline import PageNumberDetector
 
-    def preprocess_image(self, image_path):
-        img = cv2.imread(image_path)
-        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
-    def detect_page_number(self, image_path, cropped_folder):
-        try:
-            img = self.preprocess_image(image_path)
-            results = self.model.predict(img, conf=0.5)
+def process_folder(detector, folder_path, cropped_folder):
+    os.makedirs(cropped_folder, exist_ok=True)
+    filenames = [filename for filename in os.listdir(folder_path)
+                 if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
+    images = [cv2.imread(os.path.join(folder_path, filename)) for filename in filenames]
+    details = detector.detect_batch_details(images)
 
-            for result in results:
-                boxes = result.boxes.xyxy.cpu().numpy()
-
-                if len(boxes) == 0:
-                    return "No page number detected"
-
-                largest_box = max(boxes, key=lambda box: (box[2]-box[0]) * (box[3]-box[1]))
-                x1, y1, x2, y2 = map(int, largest_box)
-
-                cropped = img[y1:y2, x1:x2]
-                cropped_image_name = os.path.basename(image_path)
-                cropped_image_path = os.path.join(cropped_folder, cropped_image_name)
-                cv2.imwrite(cropped_image_path, cropped)
-
-                ocr_result = self.ocr.readtext(cropped)
-
-                for text_entry in ocr_result:
-                    text = text_entry[1]
-                    if re.search(self.page_number_pattern, text):
-                        return text
-
-            return "Page number found but not recognized"
-
-        except Exception as e:
-            return f"Error: {str(e)}"
-
-    def process_folder(self, folder_path, cropped_folder):
-        os.makedirs(cropped_folder, exist_ok=True)
-        results = {}
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff')):
-                image_path = os.path.join(folder_path, filename)
-                page_number = self.detect_page_number(image_path, cropped_folder)
-                results[filename] = page_number
-        return results
+    # Keep the YOLO crops for inspecting misreads.
+    for filename, img, (page_number, box, _) in zip(filenames, images, details):
+        if box is not None:
+            x1, y1, x2, y2 = map(int, box)
+            cv2.imwrite(os.path.join(cropped_folder, filename), img[y1:y2, x1:x2])
+    return {filename: page_number for filename, (page_number, _, _) in zip(filenames, details)}
 
 # Main execution
 bookwise_folder = "bookwise"
@@ -76,7 +39,7 @@ with open(result_file, "w") as file:
 
         if os.path.isdir(book_path):  # Ensure it's a folder
             cropped_folder = os.path.join("cropped", book_folder)  # Fix missing closing quotation mark
-            result = detector.process_folder(book_path, cropped_folder)  # Fix indentation and missing part
+            result = process_folder(detector, book_path, cropped_folder)  # Fix indentation and missing part
 
             # Count total images and successful detections
             total_images = len(result)
@@ -0,0 +1,230 @@
+"""YOLO inference backends for PageNumberDetector.
+
+``torch`` runs the weights through ultralytics. ``onnx`` exports them to
+ONNX once (next to the .pt file) and runs them on onnxruntime with
+letterboxing and NMS in NumPy, so no torch or ultralytics is needed at
+inference time; ``onnx-int8`` does the same on a dynamically quantized
+copy. Every backend's predict() returns one (N, 4) array of xyxy pixel
+boxes per image.
+
+    python detector_backends.py verify --backend onnx
+
+checks a backend against torch on the validation images.
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+BACKENDS = ['torch', 'onnx', 'onnx-int8']
+# Input size the detector was trained and exported at.
+IMGSZ = 640
+NMS_IOU = 0.7
+LETTERBOX_FILL = 114
+VAL_IMAGES = os.path.join("datasets", "data", "images", "val")
+# One export at a time per process (the model loader and the worker pool
+# may both ask for it).
+_export_lock = threading.Lock()
+
+
+def resolve_backend(name):
+    """Map 'auto' to onnx when onnxruntime is installed, else torch."""
+    if name == 'auto':
+        return 'onnx' if importlib.util.find_spec('onnxruntime') is not None else 'torch'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name}")
+    return name
+
+
+def load_backend(name, model_path, threads=None):
+    """The ``name`` backend for ``model_path``: .pt weights, or for onnx backends a finished .onnx export."""
+    name = resolve_backend(name)
+    if name == 'torch':
+        return TorchBackend(model_path)
+    if model_path.endswith('.onnx'):
+        return OnnxBackend(model_path, threads)
+    return OnnxBackend(export_onnx(model_path, int8=name == 'onnx-int8'), threads)
+
+
+def export_onnx(model_path, int8=False):
+    """Path of the ONNX (or INT8) export of ``model_path``, exporting when missing or stale.
+
+    Exports are written to a temporary file next to the weights and moved
+    into place, so a reader never sees a half-written model.
+    """
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    int8_path = os.path.splitext(model_path)[0] + ".int8.onnx"
+    folder = os.path.dirname(os.path.abspath(model_path))
+    with _export_lock:
+        if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(model_path):
+            from ultralytics import YOLO
+            # ultralytics writes the export next to the weights it loads, so
+            # export a copy of them in a scratch folder.
+            with tempfile.TemporaryDirectory(dir=folder) as work_dir:
+                weights = shutil.copy2(model_path, work_dir)
+                os.replace(YOLO(weights).export(format='onnx', imgsz=IMGSZ, dynamic=True), onnx_path)
+        if not int8:
+            return onnx_path
+
+        if not os.path.exists(int8_path) or os.path.getmtime(int8_path) < os.path.getmtime(onnx_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            with tempfile.TemporaryDirectory(dir=folder) as work_dir:
+                quantized = os.path.join(work_dir, os.path.basename(int8_path))
+                quantize_dynamic(onnx_path, quantized, weight_type=QuantType.QUInt8)
+                os.replace(quantized, int8_path)
+        return int8_path
+
+
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+
+    def predict(self, images, conf):
+        return [result.boxes.xyxy.cpu().numpy() for result in self.model.predict(images, conf=conf)]
+
+
+def letterbox(image, size=IMGSZ):
+    """Resize keeping the aspect ratio and pad to size x size; returns (image, gain, (pad_x, pad_y))."""
+    height, width = image.shape[:2]
+    gain = min(size / height, size / width)
+    new_w, new_h = int(round(width * gain)), int(round(height * gain))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    padded = cv2.copyMakeBorder(resized, top, size - new_h - top, left, size - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(LETTERBOX_FILL,) * 3)
+    return padded, gain, (left, top)
+
+
+def nms(boxes, scores, iou_threshold=NMS_IOU):
+    """Indices of the boxes kept by greedy non-maximum suppression."""
+    x0, y0, x1, y1 = boxes.T
+    areas = (x1 - x0) * (y1 - y0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        w = np.clip(np.minimum(x1[i], x1[order[1:]]) - np.maximum(x0[i], x0[order[1:]]), 0, None)
+        h = np.clip(np.minimum(y1[i], y1[order[1:]]) - np.maximum(y0[i], y0[order[1:]]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, onnx_path, threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, images, conf):
+        if not images:
+            return []
+        batch, transforms = [], []
+        for image in images:
+            padded, gain, pad = letterbox(image)
+            batch.append(cv2.cvtColor(padded, cv2.COLOR_BGR2RGB).transpose(2, 0, 1))
+            transforms.append((gain, pad, image.shape[:2]))
+        inputs = np.ascontiguousarray(np.stack(batch), dtype=np.float32) / 255.0
+        # YOLOv8 head: (batch, 4 + classes, anchors), boxes as cx, cy, w, h.
+        outputs = self.session.run(None, {self.input_name: inputs})[0]
+        return [self._boxes(prediction, conf, *transform) for prediction, transform in zip(outputs, transforms)]
+
+    def _boxes(self, prediction, conf, gain, pad, shape):
+        scores = prediction[4:].max(axis=0)
+        candidates = prediction[:4, scores > conf].T
+        scores = scores[scores > conf]
+        if not len(scores):
+            return np.zeros((0, 4), dtype=np.float32)
+        cx, cy, w, h = candidates.T
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        boxes = boxes[nms(boxes, scores)]
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / gain
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / gain
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        return boxes
+
+
+def largest_box(boxes):
+    return max(boxes, key=lambda b: (b[2]-b[0]) * (b[3]-b[1]))
+
+
+def box_iou(a, b):
+    w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    union = (a[2]-a[0]) * (a[3]-a[1]) + (b[2]-b[0]) * (b[3]-b[1]) - w * h
+    return w * h / union if union > 0 else 0.0
+
+
+def verify(backend, model_path, image_dir=VAL_IMAGES, conf=0.5, batch_size=8):
+    """Compare ``backend`` with torch on a folder of page images; returns a summary dict.
+
+    Agreement means both found nothing, or the largest boxes (the one the
+    detector reads) overlap with IoU >= 0.9.
+    """
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.png")) + glob.glob(os.path.join(image_dir, "*.jpg")))
+    images = [cv2.imread(path) for path in paths]
+    predictions = {}
+    seconds = {}
+    for name in ('torch', backend):
+        model = load_backend(name, model_path)
+        model.predict(images[:1], conf)  # warm-up
+        start = time.perf_counter()
+        predictions[name] = [boxes for first in range(0, len(images), batch_size)
+                             for boxes in model.predict(images[first:first + batch_size], conf)]
+        seconds[name] = time.perf_counter() - start
+
+    agree, ious = 0, []
+    for reference, candidate in zip(predictions['torch'], predictions[backend]):
+        if not len(reference) and not len(candidate):
+            agree += 1
+        elif len(reference) and len(candidate):
+            iou = box_iou(largest_box(reference), largest_box(candidate))
+            ious.append(iou)
+            agree += iou >= 0.9
+    return {
+        'images': len(images),
+        'agreement': agree / len(images) if images else None,
+        'mean_iou': float(np.mean(ious)) if ious else None,
+        'torch_seconds': seconds['torch'],
+        f'{backend}_seconds': seconds[backend],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and check YOLO inference backends.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    verify_parser = commands.add_parser('verify', help="compare a backend with torch on the validation images")
+    verify_parser.add_argument('--backend', choices=[name for name in BACKENDS if name != 'torch'], default='onnx')
+    verify_parser.add_argument('--model', default='best.pt')
+    verify_parser.add_argument('--images', default=VAL_IMAGES)
+    args = parser.parse_args(argv)
+
+    summary = verify(args.backend, args.model, args.images)
+    print(f"{summary['images']} images: {summary['agreement']:.1%} agree with torch, "
+          f"mean IoU {summary['mean_iou']}")
+    print(f"torch {summary['torch_seconds']:.2f} s, {args.backend} {summary[args.backend + '_seconds']:.2f} s")
+    return 0 if summary['agreement'] is not None and summary['agreement'] >= 0.95 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
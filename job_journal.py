@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+
+
+# Written next to the PDFs it describes.
+JOURNAL_NAME = "pagedetect_journal.jsonl"
+# Lines appended between fsync() calls; every line is flushed immediately.
+FSYNC_EVERY = 64
+
+
+def journal_path(folder_path):
+    return os.path.join(folder_path, JOURNAL_NAME)
+
+
+def pdf_stamp(pdf_path):
+    """Size and mtime, enough to tell that a PDF changed since it was journaled."""
+    stat = os.stat(pdf_path)
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def read_journal(path, params=None):
+    """Return {pdf_name: {page_num: entry}} from a journal file.
+
+    An entry is the page's journal line: 'page_number', 'stamp', the
+    'box' (PDF points) and OCR 'confidence' when something was read, and
+    the 'source' that answered it (see pipeline.PAGE_SOURCES).
+
+    Later lines win. With ``params``, only pages recorded by runs with the
+    same detection parameters are returned. A line cut short by a crash is
+    skipped.
+    """
+    pages = {}
+    run_params = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('event') == 'run':
+                run_params = entry.get('params')
+            elif 'page' in entry and (params is None or run_params == params):
+                pages.setdefault(entry['pdf'], {})[entry['page']] = entry
+    return pages
+
+
+class JobJournal:
+    """Append-only JSONL record of a folder run, one line per finished page.
+
+    Each page's outcome is written and flushed as soon as it is known, so a
+    crash or reboot loses at most the pages in flight. Opening with
+    ``resume=True`` loads what an earlier run of the same folder and
+    parameters already finished; completed() then lets the pipeline skip
+    those pages. PDFs are identified by file name (the journal lives in
+    their folder) and checked against their size and mtime.
+    """
+    def __init__(self, path, params, resume=True):
+        self.path = path
+        self.params = params
+        self.lock = threading.Lock()
+        self._entries = read_journal(path, params) if resume and os.path.exists(path) else {}
+        self._stamps = {}
+        self._unsynced = 0
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        self._append({'event': 'run', 'time': time.time(), 'params': params})
+
+    def _stamp(self, pdf_path):
+        if pdf_path not in self._stamps:
+            self._stamps[pdf_path] = pdf_stamp(pdf_path)
+        return self._stamps[pdf_path]
+
+    def _append(self, entry):
+        with self.lock:
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            self._unsynced += 1
+            if self._unsynced >= FSYNC_EVERY:
+                os.fsync(self.file.fileno())
+                self._unsynced = 0
+
+    def completed(self, pdf_path):
+        """{page_num: (page_number, box, confidence)} finished earlier for an unchanged pdf_path.
+
+        Pages that ended in an error are left out, so they are retried.
+        """
+        stamp = self._stamp(pdf_path)
+        return {page_num: (entry['page_number'], entry.get('box'), entry.get('confidence'))
+                for page_num, entry in self._entries.get(os.path.basename(pdf_path), {}).items()
+                if entry['stamp'] == stamp and not entry['page_number'].startswith("Error")}
+
+    def record(self, pdf_path, page_num, page_number, box=None, confidence=None, source=None):
+        self._append({'pdf': os.path.basename(pdf_path), 'stamp': self._stamp(pdf_path),
+                      'page': page_num, 'page_number': page_number,
+                      'box': [round(float(v), 2) for v in box] if box is not None else None,
+                      'confidence': confidence, 'source': source})
+
+    def finish(self):
+        self._append({'event': 'finish', 'time': time.time()})
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                os.fsync(self.file.fileno())
+                self.file.close()
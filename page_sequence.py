@@ -0,0 +1,145 @@
+import os
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+# Pages back from which a page's number is predicted. Sequences learn a
+# batch at a time, so this spans two default batches: every page of a
+# batch has a prediction from the one before it.
+MAX_SEQUENCE_STEP = 16
+# How far (PDF points) a box may sit from where the sequence expects it.
+SEQUENCE_BOX_TOLERANCE = 36
+# Normalized cross-correlation every glyph must reach against the book's
+# template for its predicted digit.
+GLYPH_MATCH_THRESHOLD = 0.8
+GLYPH_SIZE = (16, 24)
+# Books whose sequences are kept per detector (worker processes included).
+MAX_BOOKS = 16
+# Location prior: once this many recent pages of one side (recto or verso)
+# put their number in the same place, later pages on that side are read
+# there directly, with PRIOR_PADDING points of margin, without YOLO.
+PRIOR_PAGES = 3
+PRIOR_PADDING = 12
+
+
+def segment_glyphs(crop):
+    """Left-to-right glyph images of the dark text in a page-number crop, normalized to GLYPH_SIZE."""
+    if crop is None or not crop.size:
+        return []
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, boxes, _ = cv2.connectedComponentsWithStats(ink)
+    parts = [boxes[label] for label in range(1, count)]
+    if not parts:
+        return []
+    tallest = max(part[cv2.CC_STAT_HEIGHT] for part in parts)
+    # Specks and underlines are not digits; pieces of one broken digit overlap in x.
+    spans = []
+    for x, y, w, h, _ in sorted((part for part in parts if part[cv2.CC_STAT_HEIGHT] >= 0.5 * tallest),
+                                key=lambda part: part[0]):
+        if spans and x < spans[-1][2]:
+            x0, y0, x1, y1 = spans[-1]
+            spans[-1] = [x0, min(y0, y), max(x1, x + w), max(y1, y + h)]
+        else:
+            spans.append([x, y, x + w, y + h])
+    return [cv2.resize(ink[y0:y1, x0:x1], GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+            for x0, y0, x1, y1 in spans]
+
+
+def glyph_score(glyph, template):
+    return float(cv2.matchTemplate(glyph, template, cv2.TM_CCOEFF_NORMED)[0][0])
+
+
+def box_center(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+
+class BookSequence:
+    """What one book's pages have read so far: numbers, box positions and digit glyphs."""
+    def __init__(self):
+        # page_num -> (number, box in PDF points)
+        self.accepted = {}
+        # digit -> glyph image from the latest page it was read on
+        self.glyphs = {}
+
+    def expect(self, page_num):
+        """(number, box) the sequence predicts for ``page_num``, or None.
+
+        The number follows from the nearest accepted page at most
+        MAX_SEQUENCE_STEP before it, offset by the distance between them;
+        the box from the nearest of those pages on the same side of a
+        spread, when there is one.
+        """
+        before = [page for page in range(page_num - MAX_SEQUENCE_STEP, page_num) if page in self.accepted]
+        if not before:
+            return None
+        number = self.accepted[before[-1]][0] + page_num - before[-1]
+        same_side = [page for page in before if (page_num - page) % 2 == 0]
+        return number, self.accepted[(same_side or before)[-1]][1]
+
+    def location(self, page_num):
+        """Box (PDF points) where ``page_num``'s side of the book prints its number, or None.
+
+        The mean of the PRIOR_PAGES nearest accepted boxes on pages of the
+        same parity, provided they all lie within SEQUENCE_BOX_TOLERANCE of it; a
+        side that moved (say, to the top on chapter openings) has no prior
+        until it settles again.
+        """
+        nearest = sorted((page for page in self.accepted if page % 2 == page_num % 2),
+                         key=lambda page: abs(page - page_num))[:PRIOR_PAGES]
+        same_side = [self.accepted[page][1] for page in nearest]
+        if len(same_side) < PRIOR_PAGES:
+            return None
+        box = [sum(coords) / len(same_side) for coords in zip(*same_side)]
+        x, y = box_center(box)
+        for other in same_side:
+            other_x, other_y = box_center(other)
+            if abs(other_x - x) > SEQUENCE_BOX_TOLERANCE or abs(other_y - y) > SEQUENCE_BOX_TOLERANCE:
+                return None
+        return box
+
+    def confirm(self, page_num, box, crop):
+        """(text, score) when ``crop`` sits where expected and its glyphs match the predicted digits."""
+        expected = self.expect(page_num)
+        if expected is None or box is None:
+            return None
+        number, expected_box = expected
+        (x, y), (expected_x, expected_y) = box_center(box), box_center(expected_box)
+        if abs(x - expected_x) > SEQUENCE_BOX_TOLERANCE or abs(y - expected_y) > SEQUENCE_BOX_TOLERANCE:
+            return None
+        text = str(number)
+        if any(digit not in self.glyphs for digit in text):
+            return None
+        glyphs = segment_glyphs(crop)
+        if len(glyphs) != len(text):
+            return None
+        score = min(glyph_score(glyph, self.glyphs[digit]) for glyph, digit in zip(glyphs, text))
+        return (text, score) if score >= GLYPH_MATCH_THRESHOLD else None
+
+    def accept(self, page_num, text, box, crop=None):
+        """Record an accepted arabic page number, learning its digits' glyphs from ``crop``."""
+        self.accepted[page_num] = (int(text), box)
+        glyphs = segment_glyphs(crop) if crop is not None else []
+        if len(glyphs) == len(text):
+            self.glyphs.update(zip(text, glyphs))
+
+
+class SequenceTracker:
+    """BookSequences of the most recent MAX_BOOKS books, by file and modification time."""
+    def __init__(self):
+        self.books = OrderedDict()
+
+    def book(self, pdf_path):
+        try:
+            key = (pdf_path, os.path.getmtime(pdf_path), os.path.getsize(pdf_path))
+        except OSError:
+            key = (pdf_path, None, None)
+        if key in self.books:
+            self.books.move_to_end(key)
+        else:
+            self.books[key] = BookSequence()
+            while len(self.books) > MAX_BOOKS:
+                self.books.popitem(last=False)
+        return self.books[key]
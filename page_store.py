@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".pagedetect", "page_store")
+DEFAULT_STORE_BYTES = 512 * 1024 * 1024
+LOCK_NAME = "session.lock"
+
+
+def _try_lock(f):
+    """Take an exclusive lock on an open file; OSError if another process holds it."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+class PageStore:
+    """Disk space for rendered pages, bounded by a quota.
+
+    Each application instance gets its own session directory under
+    ``root``, held by a lock file for as long as the process lives. Files
+    are evicted least recently used first once the session holds more than
+    ``max_bytes``; close() removes the session, and a new PageStore removes
+    the directories of sessions whose process is gone (after a crash).
+    """
+    def __init__(self, root=DEFAULT_STORE_PATH, max_bytes=DEFAULT_STORE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.files = OrderedDict()
+        self.total_bytes = 0
+        os.makedirs(root, exist_ok=True)
+        self.recover()
+        self.session_dir = tempfile.mkdtemp(prefix="session-", dir=root)
+        self._lock_file = open(os.path.join(self.session_dir, LOCK_NAME), 'a')
+        _try_lock(self._lock_file)
+
+    def recover(self):
+        """Delete session directories left behind by processes that no longer run."""
+        for name in os.listdir(self.root):
+            session_dir = os.path.join(self.root, name)
+            if not name.startswith("session-") or not os.path.isdir(session_dir):
+                continue
+            try:
+                with open(os.path.join(session_dir, LOCK_NAME), 'a') as lock_file:
+                    _try_lock(lock_file)
+            except OSError:
+                continue  # still in use
+            shutil.rmtree(session_dir, ignore_errors=True)
+
+    def page_image(self, rasterizer, pdf_path, page_num):
+        """Path of a full-resolution render of the page, rendered only on a miss."""
+        with self.lock:
+            image_path = rasterizer.save_page(pdf_path, page_num, self.session_dir)
+            if image_path in self.files:
+                self.files.move_to_end(image_path)
+            else:
+                self.files[image_path] = os.path.getsize(image_path)
+                self.total_bytes += self.files[image_path]
+                self._evict()
+            return image_path
+
+    def _evict(self):
+        # The newest file, just handed out, is always kept.
+        while self.total_bytes > self.max_bytes and len(self.files) > 1:
+            image_path, size = self.files.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(image_path)
+            except OSError:
+                pass
+
+    def footprint(self):
+        """(bytes, files) currently on disk for this session."""
+        with self.lock:
+            return self.total_bytes, len(self.files)
+
+    def close(self):
+        with self.lock:
+            self.files.clear()
+            self.total_bytes = 0
+            if not self._lock_file.closed:
+                self._lock_file.close()
+            shutil.rmtree(self.session_dir, ignore_errors=True)
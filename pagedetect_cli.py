@@ -0,0 +1,184 @@
+"""Headless front-end to the detection pipeline, for machines without Qt.
+
+    python pagedetect_cli.py scan <folder> --workers 4 --format jsonl --output results.jsonl
+    python pagedetect_cli.py scan <folder> --resume
+    python pagedetect_cli.py report <folder>
+
+One record per page is written as soon as it is detected, to stdout unless
+--output is given. Records arrive in completion order when --workers is
+above 1; each one names its PDF and page index.
+
+Every scan also appends to the folder's job journal. --resume skips the
+pages an interrupted run already finished, and ``report`` prints the
+book-wise report from the journal without running any inference.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+from result_cache import ResultCache, DEFAULT_CACHE_PATH
+from job_journal import JobJournal, journal_path, read_journal
+from book_report import book_wise_results, dpi_check_text
+from scan_quality import book_dpis
+from stage_stats import StageStats, format_summary
+from detector_backends import BACKENDS
+from pipeline import (ModelHolder, FitzRasterizer, Pdf2ImageRasterizer, scan_pdfs, list_pdfs, new_counters,
+                      detection_params, source_summary, tier_summary, PAGE_SOURCES, DEFAULT_BATCH_SIZE, DEFAULT_DETECT_DPI,
+                      DEFAULT_BAND_FRACTION)
+
+
+FIELDS = ['pdf', 'page_index', 'page_number']
+
+
+def make_rasterizer(args):
+    if args.rasterizer == 'pdf2image':
+        return Pdf2ImageRasterizer(dpi=args.dpi)
+    return FitzRasterizer(dpi=args.dpi, detect_dpi=args.detect_dpi or None,
+                          band_fraction=args.band_fraction or None)
+
+
+def scan(args):
+    pdf_paths = list_pdfs(args.folder)
+    if not pdf_paths:
+        print(f"No PDFs found in {args.folder}", file=sys.stderr)
+        return 1
+
+    models = ModelHolder(args.model, args.batch_size, args.backend)
+    rasterizer = make_rasterizer(args)
+    cache = None if args.no_cache else ResultCache(args.cache)
+    journal = None
+    if not args.no_journal:
+        journal = JobJournal(args.journal or journal_path(args.folder),
+                             detection_params(rasterizer, backend=models.backend, text_layer=not args.no_text_layer),
+                             args.resume)
+    counters = new_counters()
+    stats = StageStats()
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, FIELDS) if args.format == 'csv' else None
+        if writer is not None:
+            writer.writeheader()
+        for done, total, pdf_path, page_num, page_number, _ in scan_pdfs(pdf_paths, models, rasterizer,
+                                                                         args.workers, thumb_size=None,
+                                                                         counters=counters,
+                                                                         cache=cache, journal=journal,
+                                                                         stats=stats,
+                                                                         text_layer=not args.no_text_layer):
+            record = {'pdf': os.path.basename(pdf_path), 'page_index': page_num, 'page_number': page_number}
+            if writer is not None:
+                writer.writerow(record)
+            else:
+                out.write(json.dumps(record) + '\n')
+            out.flush()
+            if args.output:
+                print(f"\r{done}/{total} pages", end='', file=sys.stderr)
+        if journal is not None:
+            journal.finish()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+            print(file=sys.stderr)
+        models.close()
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+
+    print(f"Cache: {counters['cache_hits']} hits, {counters['cache_misses']} misses. "
+          f"Resumed from journal: {counters['resumed']} pages.", file=sys.stderr)
+    print(source_summary(counters), file=sys.stderr)
+    print(tier_summary(counters), file=sys.stderr)
+    if args.stats or args.trace:
+        print(format_summary(stats.summary()), file=sys.stderr)
+    if args.stats:
+        stats.to_json(args.stats)
+    if args.trace:
+        stats.to_chrome_trace(args.trace)
+    return 0
+
+
+def report(args):
+    path = args.journal or journal_path(args.folder)
+    if not os.path.exists(path):
+        print(f"No job journal at {path}", file=sys.stderr)
+        return 1
+    entries = read_journal(path)
+    rows = sorted((pdf_name, page_num, entry['page_number'])
+                  for pdf_name, pages in entries.items()
+                  for page_num, entry in pages.items())
+    # The PDFs sit next to their journal; their DPIs are read from the
+    # image placements, without rendering anything.
+    folder = os.path.dirname(os.path.abspath(path))
+    page_dpis = {pdf_name: book_dpis(os.path.join(folder, pdf_name)) for pdf_name in {row[0] for row in rows}}
+    book_results = book_wise_results(rows, page_dpis)
+    if args.format == 'json':
+        json.dump(book_results, sys.stdout, indent=2)
+        print()
+        return 0
+    for book_name, details in book_results.items():
+        print(f"Book: {book_name}")
+        print(f"  Missing pages: {', '.join(map(str, details['missing_pages'])) or '-'}")
+        print(f"  All pages above 300 DPI: {dpi_check_text(details)}")
+        print(f"  In-order pages: {', '.join(map(str, details['in_order_pages'])) or 'correct order'}")
+        if details['suspect_pages']:
+            print("  Suspect reads: " + ", ".join(f"page {page_num}: {number}"
+                                                   for page_num, number in details['suspect_pages']))
+        print(f"  Blank pages: {', '.join(map(str, details['blank_pages'])) or '-'}; "
+              f"plates: {', '.join(map(str, details['plate_pages'])) or '-'}; "
+              f"no number read: {', '.join(map(str, details['undetected_pages'])) or '-'}")
+    # Pages journaled before sources were recorded count as 'unknown'.
+    sources = dict.fromkeys(PAGE_SOURCES + ('cache',), 0)
+    for pages in entries.values():
+        for entry in pages.values():
+            source = entry.get('source') or 'unknown'
+            sources[source] = sources.get(source, 0) + 1
+    print("Pages by source: " + ", ".join(f"{source} {count}" for source, count in sources.items()))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect printed page numbers in PDFs.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = commands.add_parser('scan', help="detect page numbers for every PDF in a folder")
+    scan_parser.add_argument('folder')
+    scan_parser.add_argument('--workers', type=int, default=1, help="worker processes (1 runs in-process)")
+    scan_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    scan_parser.add_argument('--output', '-o', help="output file (default: stdout)")
+    scan_parser.add_argument('--model', default='best.pt', help="YOLO weights")
+    scan_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    scan_parser.add_argument('--backend', choices=['auto'] + BACKENDS, default='auto',
+                             help="YOLO inference backend (auto: onnx when onnxruntime is installed)")
+    scan_parser.add_argument('--rasterizer', choices=['fitz', 'pdf2image'], default='fitz')
+    scan_parser.add_argument('--dpi', type=int, default=300)
+    scan_parser.add_argument('--detect-dpi', type=int, default=DEFAULT_DETECT_DPI,
+                             help="proxy resolution for detection, 0 for full resolution (fitz only)")
+    scan_parser.add_argument('--band-fraction', type=float, default=DEFAULT_BAND_FRACTION,
+                             help="margin band height as a share of the page, 0 for whole pages (fitz only)")
+    scan_parser.add_argument('--no-text-layer', action='store_true',
+                             help="send every page to the models, even when the PDF's text gives its number")
+    scan_parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help="result cache database")
+    scan_parser.add_argument('--no-cache', action='store_true')
+    scan_parser.add_argument('--journal', help="job journal (default: in the folder)")
+    scan_parser.add_argument('--resume', action='store_true', help="skip pages the journal already has")
+    scan_parser.add_argument('--no-journal', action='store_true')
+    scan_parser.add_argument('--stats', help="write per-stage timings (p50/p95), pages/s and peak RSS as JSON")
+    scan_parser.add_argument('--trace', help="write a Chrome trace (chrome://tracing, Perfetto) of every stage")
+    scan_parser.set_defaults(func=scan)
+
+    report_parser = commands.add_parser('report', help="book-wise report from a folder's job journal")
+    report_parser.add_argument('folder')
+    report_parser.add_argument('--journal', help="job journal (default: in the folder)")
+    report_parser.add_argument('--format', choices=['text', 'json'], default='text')
+    report_parser.set_defaults(func=report)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,1457 @@
+import collections
+import contextlib
+import functools
+import hashlib
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from result_cache import file_hash
+from stage_stats import StageStats
+from detector_backends import export_onnx, load_backend, largest_box, resolve_backend
+from text_layer import ROMAN_NUMERAL, read_text_layer
+from page_sequence import GLYPH_MATCH_THRESHOLD, MAX_SEQUENCE_STEP, PRIOR_PADDING, PRIOR_PAGES, SequenceTracker
+from scan_quality import (BLANK_INK_DENSITY, BLANK_PAGE, PLATE_MIDTONE_SHARE, PLATE_PAGE, PRECHECK_SIZE,
+                          classify_page, has_ink)
+
+
+# YOLO confidence threshold for a page-number box.
+DETECTION_CONF = 0.5
+# Pages sent through YOLO per predict() call.
+DEFAULT_BATCH_SIZE = 8
+# Proxy resolution for two-resolution mode: an A4 page at 72 DPI is already
+# larger than the imgsz=640 the detector was trained at.
+DEFAULT_DETECT_DPI = 72
+# Share of the page height rendered at the top and bottom in margin-band mode.
+DEFAULT_BAND_FRACTION = 0.12
+# Characters a page number can contain (arabic and roman numerals).
+PAGE_NUMBER_ALLOWLIST = '0123456789ivxlcdmIVXLCDM'
+# Text height EasyOCR's recognizer works at.
+OCR_LINE_HEIGHT = 64
+# Escalation: a first-pass answer is kept when it reads as a page number
+# with at least this OCR confidence and fits its neighbours; other pages go
+# through the costlier tiers after 'fast' (see PageNumberDetector._escalate).
+ACCEPT_CONFIDENCE = 0.8
+TIERS = ('fast', 'full_dpi', 'readtext')
+# The later tiers look at every box YOLO finds at this lower threshold, up to
+# ESCALATION_MAX_BOXES of the largest.
+ESCALATION_CONF = 0.25
+ESCALATION_MAX_BOXES = 4
+PAGE_NUMBER_TEXT = re.compile(r'^(\d{1,4}|' + ROMAN_NUMERAL + r')$', re.IGNORECASE)
+
+
+def _timer(stats, stage):
+    """stats.timer(stage), or a no-op when the run isn't being timed."""
+    return stats.timer(stage) if stats is not None else contextlib.nullcontext()
+
+
+def is_page_number(text):
+    return bool(text) and PAGE_NUMBER_TEXT.match(text.strip()) is not None
+
+
+def box_area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def ocr_variants(crop):
+    """The crop, binarized with Otsu's threshold, and binarized at twice the size."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return [crop, binary, cv2.resize(binary, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)]
+
+
+def _out_of_sequence(chunk, numbers, i):
+    """True when pages i-1 and i+1 of the same PDF read n and n+2 but page i doesn't read n+1."""
+    if not 0 < i < len(chunk) - 1:
+        return False
+    previous, page, following = chunk[i - 1], chunk[i], chunk[i + 1]
+    if not all(isinstance(p, PageImage) for p in (previous, page, following)):
+        return False
+    if not (previous.pdf_path == page.pdf_path == following.pdf_path
+            and previous.page_num + 1 == page.page_num == following.page_num - 1):
+        return False
+    before, after = numbers[i - 1][0], numbers[i + 1][0]
+    if not (before.isdigit() and after.isdigit()) or int(after) - int(before) != 2:
+        return False
+    return numbers[i][0] != str(int(before) + 1)
+
+
+# Page Number Detector (shared by the GUI front-ends)
+class PageNumberDetector:
+    def __init__(self, model_path, batch_size=DEFAULT_BATCH_SIZE, recognition_only=True, backend='torch',
+                 threads=None, escalate=True, locate=True, precheck=True):
+        # YOLO inference backend, see detector_backends: predict() gives xyxy boxes per image.
+        self.model = load_backend(backend, model_path, threads)
+        # Imported here rather than at start-up: EasyOCR pulls in torch.
+        import easyocr
+        self.ocr = easyocr.Reader(['en'])
+        self.page_number_pattern = r'\b\d+\b'
+        self.batch_size = batch_size
+        # Treat the YOLO box as the text region and skip EasyOCR's own (CRAFT)
+        # text detector; False goes back to a full readtext() per crop.
+        self.recognition_only = recognition_only
+        # Send pages without an accepted first-pass answer through TIERS.
+        self.escalate = escalate
+        # Per-book page sequences: a page whose box sits where the sequence
+        # expects it and whose glyphs match the predicted digits skips OCR.
+        # Learned anew every run (new_run), so no result depends on the last one.
+        self.sequences = SequenceTracker()
+        # Read pages at their book's learned number position (the location
+        # prior) before running YOLO on them.
+        self.locate = locate
+        # Answer blank pages and plates from their ink alone (scan_quality.classify_page).
+        self.precheck = precheck
+        # Optional StageStats the pipeline attaches for the length of a run.
+        self.stats = None
+        self.reset_counters()
+
+    def new_run(self):
+        """Forget the page sequences and location priors learned in earlier runs."""
+        self.sequences = SequenceTracker()
+
+    def reset_counters(self):
+        # Margin-band pages seen, and how many of those needed the full page.
+        self.band_pages = 0
+        self.band_fallbacks = 0
+        # Pages and seconds per tier, and escalated pages that ended with an
+        # accepted answer.
+        self.tier_pages = dict.fromkeys(TIERS, 0)
+        self.tier_seconds = dict.fromkeys(TIERS, 0.0)
+        self.escalations_resolved = 0
+        # Pages confirmed from their book's sequence without OCR.
+        self.sequence_confirmed = 0
+        # Pages read at their location prior, and those needing no YOLO after all.
+        self.location_pages = 0
+        self.location_hits = 0
+        # Pages the pre-check answered as blank or as a plate.
+        self.blank_pages = 0
+        self.plate_pages = 0
+
+    def _timer(self, stage):
+        return _timer(self.stats, stage)
+
+    def detect_page_number(self, image):
+        """Accepts a PageImage, a BGR page array or a path to an image file."""
+        return self.detect_batch([image])[0]
+
+    def detect_batch(self, pages):
+        """Detect page numbers for a list of PageImages, BGR arrays or image paths.
+
+        Pages go through YOLO ``batch_size`` at a time in a single predict()
+        call; the returned list lines up with ``pages``.
+        """
+        return [page_number for page_number, _, _ in self.detect_batch_details(pages)]
+
+    def detect_batch_details(self, pages):
+        """Like detect_batch, but returns (page_number, box, confidence) per page.
+
+        ``box`` is in PDF points for PageImages (pixels otherwise) and
+        ``confidence`` is the OCR confidence (the glyph match score for
+        pages confirmed from the book's sequence); both are None when
+        nothing was read.
+        """
+        page_numbers = []
+        for start in range(0, len(pages), self.batch_size):
+            started = time.perf_counter()
+            chunk = list(pages[start:start + self.batch_size])
+            if any(isinstance(page, str) for page in chunk):
+                with self._timer('imread'):
+                    chunk = [cv2.imread(page) if isinstance(page, str) else page for page in chunk]
+            chunk_numbers = [None] * len(chunk)
+            crops = {}
+            boxes = {}
+            confirmed = {}
+            if self.precheck:
+                with self._timer('precheck'):
+                    self._precheck(chunk, chunk_numbers)
+            prechecked = {i for i in range(len(chunk)) if chunk_numbers[i] is not None}
+            if self.locate:
+                with self._timer('location_prior'):
+                    self._read_locations(chunk, chunk_numbers, crops, boxes, confirmed)
+            detect = [i for i in range(len(chunk)) if chunk_numbers[i] is None]
+            if detect:
+                detected = [chunk[i] for i in detect]
+                try:
+                    with self._timer('yolo'):
+                        results = self.model.predict([page.image if isinstance(page, PageImage) else page
+                                                      for page in detected], conf=DETECTION_CONF)
+                    self._band_fallback(detected, results)
+                except Exception as e:
+                    for i in detect:
+                        chunk_numbers[i] = (f"Error: {str(e)}", None, None)
+                    page_numbers.extend(chunk_numbers)
+                    continue
+
+                yolo_crops = {}
+                yolo_boxes = {}
+                for i, page, result in zip(detect, detected, results):
+                    chunk[i] = page
+                    try:
+                        if len(result) == 0:
+                            chunk_numbers[i] = ("No page number detected", None, None)
+                            continue
+                        box = largest_box(result)
+                        with self._timer('crop'):
+                            yolo_crops[i] = page.crop(box) if isinstance(page, PageImage) else self._crop_array(page, box)
+                        yolo_boxes[i] = page.to_points(box) if isinstance(page, PageImage) else [float(v) for v in box]
+                    except Exception as e:
+                        chunk_numbers[i] = (f"Error: {str(e)}", None, None)
+                for i, answer in self._read_cropped(chunk, yolo_crops, yolo_boxes, confirmed).items():
+                    chunk_numbers[i] = answer
+                crops.update(yolo_crops)
+                boxes.update(yolo_boxes)
+
+            first_pass = list(chunk_numbers)
+            self.tier_pages['fast'] += len(chunk)
+            self.tier_seconds['fast'] += time.perf_counter() - started
+            if self.escalate:
+                self._escalate(chunk, chunk_numbers, skip=prechecked | set(confirmed))
+            self._track_sequence(chunk, chunk_numbers, first_pass, crops)
+            page_numbers.extend(chunk_numbers)
+        return page_numbers
+
+    def _precheck(self, chunk, numbers):
+        """Answer, in place, the pages of ``chunk`` the pre-check finds blank or a plate.
+
+        A margin-band page is only looked at in full, as a small render,
+        when its bands hold no ink at all.
+        """
+        for i, page in enumerate(chunk):
+            band_fraction = DEFAULT_BAND_FRACTION
+            if isinstance(page, PageImage):
+                band_fraction = page.rasterizer.band_fraction or DEFAULT_BAND_FRACTION
+                if page.bands:
+                    if has_ink(page.image):
+                        continue
+                    try:
+                        image = page.rasterizer.render_thumbnail(page.pdf_path, page.page_num, PRECHECK_SIZE)
+                    except Exception:
+                        continue  # the detector gets the page
+                else:
+                    image = page.image
+            else:
+                image = page
+            kind = classify_page(image, band_fraction)
+            if kind == BLANK_PAGE:
+                self.blank_pages += 1
+            elif kind == PLATE_PAGE:
+                self.plate_pages += 1
+            else:
+                continue
+            numbers[i] = (kind, None, None)
+
+    def _read_cropped(self, chunk, crops, boxes, confirmed):
+        """{i: (text, box, confidence)} for the cropped pages of ``chunk``.
+
+        Pages their book's sequence confirms skip OCR and are added to
+        ``confirmed``; the rest are read in one OCR call.
+        """
+        with self._timer('sequence_check'):
+            matched = self._confirm_sequence(chunk, crops, boxes)
+        confirmed.update(matched)
+        answers = {i: (text, boxes[i], score) for i, (text, score) in matched.items()}
+        to_read = [i for i in crops if i not in matched]
+        with self._timer('ocr'):
+            recognized = self._read_crops([crops[i] for i in to_read])
+        for i, (text, confidence) in zip(to_read, recognized):
+            if text:
+                answers[i] = (text, boxes[i], confidence)
+            else:
+                answers[i] = ("Page number found but not recognized", boxes[i], None)
+        return answers
+
+    def _read_locations(self, chunk, numbers, crops, boxes, confirmed):
+        """Read, in place, the pages of ``chunk`` whose book has a location prior for them.
+
+        The prior's region is cropped straight from the page and read as a
+        YOLO crop would be. An answer is kept when it is a page number read
+        with at least ACCEPT_CONFIDENCE that the sequence predicts (or its
+        glyphs confirm); other pages are left None for YOLO. Pages already
+        answered (by the pre-check) are left alone.
+        """
+        located_crops = {}
+        located_boxes = {}
+        for i, page in enumerate(chunk):
+            if not isinstance(page, PageImage) or numbers[i] is not None:
+                continue
+            box = self.sequences.book(page.pdf_path).location(page.page_num)
+            if box is None:
+                continue
+            region = [box[0] - PRIOR_PADDING, box[1] - PRIOR_PADDING, box[2] + PRIOR_PADDING, box[3] + PRIOR_PADDING]
+            try:
+                crop = page.clip(region)
+            except Exception:
+                continue  # YOLO gets the page
+            if crop.size:
+                located_crops[i] = crop
+                located_boxes[i] = box
+        self.location_pages += len(located_crops)
+        matched = {}
+        for i, (text, box, confidence) in self._read_cropped(chunk, located_crops, located_boxes, matched).items():
+            if not is_page_number(text) or confidence is None or confidence < ACCEPT_CONFIDENCE:
+                continue
+            expected = self.sequences.book(chunk[i].pdf_path).expect(chunk[i].page_num)
+            if i not in matched and (expected is None or text.strip() != str(expected[0])):
+                continue
+            numbers[i] = (text.strip(), box, confidence)
+            crops[i] = located_crops[i]
+            boxes[i] = box
+            if i in matched:
+                confirmed[i] = matched[i]
+            self.location_hits += 1
+
+    def _band_fallback(self, chunk, results):
+        """Re-run margin-band pages with no detection on the full page, in place."""
+        banded = [i for i, page in enumerate(chunk) if isinstance(page, PageImage) and page.bands]
+        missed = [i for i in banded if len(results[i]) == 0]
+        self.band_pages += len(banded)
+        self.band_fallbacks += len(missed)
+        if not missed:
+            return
+
+        with self._timer('render_full_page'):
+            full_pages = [chunk[i].full_page() for i in missed]
+        with self._timer('yolo_fallback'):
+            full_results = self.model.predict([p.image for p in full_pages], conf=DETECTION_CONF)
+        for i, page, result in zip(missed, full_pages, full_results):
+            chunk[i] = page
+            results[i] = result
+
+    def _needs_escalation(self, chunk, numbers, i):
+        text, _, confidence = numbers[i]
+        if text.startswith("Error"):
+            return False
+        if not is_page_number(text) or confidence is None or confidence < ACCEPT_CONFIDENCE:
+            return True
+        return _out_of_sequence(chunk, numbers, i)
+
+    def _confirm_sequence(self, chunk, crops, boxes):
+        """{i: (text, score)} for the cropped pages their book's sequence confirms."""
+        confirmed = {}
+        for i in crops:
+            page = chunk[i]
+            if isinstance(page, PageImage):
+                answer = self.sequences.book(page.pdf_path).confirm(page.page_num, boxes[i], crops[i])
+                if answer is not None:
+                    confirmed[i] = answer
+        self.sequence_confirmed += len(confirmed)
+        return confirmed
+
+    def _track_sequence(self, chunk, numbers, first_pass, crops):
+        """Feed accepted arabic page numbers to their books' sequences.
+
+        Glyphs are only learned from first-pass crops the final answer
+        agrees with, the same kind of crop _confirm_sequence checks.
+        """
+        for i, page in enumerate(chunk):
+            text, box, confidence = numbers[i]
+            if not (isinstance(page, PageImage) and text.isdigit() and box is not None
+                    and confidence is not None and confidence >= ACCEPT_CONFIDENCE):
+                continue
+            crop = crops.get(i) if first_pass[i][0] == text else None
+            self.sequences.book(page.pdf_path).accept(page.page_num, text, box, crop)
+
+    def _escalate(self, chunk, numbers, skip=()):
+        """Re-read, in place, the pages of ``chunk`` whose first-pass answer isn't accepted.
+
+        Tier 'full_dpi' renders the whole page at full resolution and reads
+        every YOLO box on it (recognition only); tier 'readtext' runs
+        EasyOCR's full readtext() over those boxes and binarized and
+        upscaled copies of them. A page leaves at the first tier with an
+        accepted answer, or keeps the best page number any tier read (else
+        its first-pass result). Pages in ``skip`` were already settled by
+        their book's sequence.
+        """
+        pending = [i for i in range(len(chunk)) if i not in skip and self._needs_escalation(chunk, numbers, i)]
+        best = {i: numbers[i] for i in pending if is_page_number(numbers[i][0])}
+        crops = {}
+        for tier in TIERS[1:]:
+            if not pending:
+                break
+            started = time.perf_counter()
+            try:
+                with self._timer('tier_' + tier):
+                    if tier == 'full_dpi':
+                        crops = dict(zip(pending, self._full_dpi_boxes([chunk[i] for i in pending])))
+                        answers = self._read_boxes([crops[i] for i in pending])
+                    else:
+                        answers = [self._readtext_boxes(crops[i]) for i in pending]
+            except Exception:
+                break  # escalation is best effort; the first pass stands
+            finally:
+                self.tier_pages[tier] += len(pending)
+                self.tier_seconds[tier] += time.perf_counter() - started
+
+            for i, candidates in zip(list(pending), answers):
+                if not candidates:
+                    continue
+                answer = max(candidates, key=lambda candidate: candidate[2])
+                if answer[2] >= ACCEPT_CONFIDENCE:
+                    best[i] = answer
+                    pending.remove(i)
+                    self.escalations_resolved += 1
+                elif i not in best or answer[2] > (best[i][2] or 0.0):
+                    best[i] = answer
+        for i, answer in best.items():
+            numbers[i] = answer
+
+    def _full_dpi_boxes(self, pages):
+        """(crop, box) for the largest likely page-number boxes of each page, at full resolution."""
+        full = [page.rasterizer.render_page(page.pdf_path, page.page_num)
+                if isinstance(page, PageImage) and (page.bands or page.dpi < page.rasterizer.dpi) else page
+                for page in pages]
+        results = self.model.predict([page.image if isinstance(page, PageImage) else page for page in full],
+                                     conf=ESCALATION_CONF)
+        boxes = []
+        for page, result in zip(full, results):
+            largest = sorted(result, key=box_area, reverse=True)[:ESCALATION_MAX_BOXES]
+            if isinstance(page, PageImage):
+                boxes.append([(page.crop(box), page.to_points(box)) for box in largest])
+            else:
+                boxes.append([(self._crop_array(page, box), [float(v) for v in box]) for box in largest])
+        return boxes
+
+    def _read_boxes(self, page_boxes):
+        """Page-number readings (text, box, confidence) of every box, one OCR call for all pages."""
+        flat = [(page, box, crop) for page, boxes in enumerate(page_boxes) for crop, box in boxes if crop.size]
+        answers = [[] for _ in page_boxes]
+        for (page, box, _), (text, confidence) in zip(flat, self._read_crops([crop for _, _, crop in flat])):
+            if is_page_number(text) and confidence is not None:
+                answers[page].append((text.strip(), box, float(confidence)))
+        return answers
+
+    def _readtext_boxes(self, boxes):
+        """Page-number readings from full readtext() on every box and its preprocessed variants."""
+        answers = []
+        for crop, box in boxes:
+            if not crop.size:
+                continue
+            for variant in ocr_variants(crop):
+                for entry in self.ocr.readtext(variant, allowlist=PAGE_NUMBER_ALLOWLIST):
+                    if is_page_number(entry[1]):
+                        answers.append((entry[1].strip(), box, float(entry[2])))
+        return answers
+
+    def _crop_array(self, img, box):
+        x1, y1, x2, y2 = map(int, box)
+        return img[y1:y2, x1:x2]
+
+    def _read_crops(self, crops):
+        """OCR a list of crops; returns the first (text, confidence) found in each."""
+        if not crops:
+            return []
+        if not self.recognition_only:
+            return [self._pick_text(self.ocr.readtext(cropped)) for cropped in crops]
+        try:
+            return self.recognize_crops(crops)
+        except Exception as e:
+            return [(f"Error: {str(e)}", None)] * len(crops)
+
+    def _pick_text(self, ocr_result):
+        """First entry that looks like a page number, else the first entry read."""
+        for entry in ocr_result:
+            if re.search(self.page_number_pattern, entry[1]):
+                return entry[1], float(entry[2])
+        return next(((entry[1], float(entry[2])) for entry in ocr_result), ('', 0.0))
+
+    def recognize_crops(self, crops, allowlist=PAGE_NUMBER_ALLOWLIST):
+        """Run EasyOCR's recognizer alone on YOLO crops, all pages in one call.
+
+        The crops are scaled to the recognizer's line height and laid side by
+        side on one strip, each registered as its own text box, so the whole
+        batch goes through a single recognize() call. Returns a
+        (text, confidence) pair per crop.
+        """
+        gap = OCR_LINE_HEIGHT // 2
+        strips, spans, x = [], [], 0
+        for cropped in crops:
+            if cropped.size == 0:
+                spans.append(None)
+                continue
+            gray = cv2.cvtColor(cropped, cv2.COLOR_BGR2GRAY) if cropped.ndim == 3 else cropped
+            width = max(1, int(round(gray.shape[1] * OCR_LINE_HEIGHT / gray.shape[0])))
+            strips.append(cv2.resize(gray, (width, OCR_LINE_HEIGHT), interpolation=cv2.INTER_AREA))
+            strips.append(np.full((OCR_LINE_HEIGHT, gap), 255, dtype=np.uint8))
+            spans.append((x, x + width))
+            x += width + gap
+
+        recognized = [('', 0.0)] * len(crops)
+        boxes = [span for span in spans if span is not None]
+        if not boxes:
+            return recognized
+
+        canvas = np.hstack(strips)
+        ocr_result = self.ocr.recognize(canvas, horizontal_list=[[x0, x1, 0, OCR_LINE_HEIGHT] for x0, x1 in boxes],
+                                        free_list=[], allowlist=allowlist, batch_size=len(boxes), detail=1)
+        # Match results back to crops by where they sit on the strip.
+        for bbox, text, confidence in ocr_result:
+            center = (bbox[0][0] + bbox[1][0]) / 2
+            for i, span in enumerate(spans):
+                if span is not None and span[0] <= center <= span[1]:
+                    recognized[i] = (text.strip(), float(confidence))
+                    break
+        return recognized
+
+
+class PageImage:
+    """A rendered page: the image YOLO sees plus enough to re-render parts of it.
+
+    ``dpi`` is the resolution of ``image``. When it is below the rasterizer's
+    full resolution (two-resolution mode), crops are re-rendered at full DPI
+    from the PDF instead of being cut out of the low-resolution proxy.
+
+    In margin-band mode ``image`` is the top and bottom strips stacked on top
+    of each other and ``bands`` lists (image_y0, image_y1, page_y0) for each
+    strip, page_y0 being in PDF points. ``bands`` is None for a whole page.
+    """
+    def __init__(self, pdf_path, page_num, image, dpi, rasterizer, bands=None):
+        self.pdf_path = pdf_path
+        self.page_num = page_num
+        self.image = image
+        self.dpi = dpi
+        self.rasterizer = rasterizer
+        self.bands = bands
+
+    def _band(self, y1, y2):
+        if not self.bands:
+            return 0, self.image.shape[0], 0.0
+        center = (y1 + y2) / 2
+        for band in self.bands:
+            if band[0] <= center < band[1]:
+                return band
+        return self.bands[-1]
+
+    def to_points(self, box):
+        """Map ``box`` (pixels of ``image``) to PDF points on the page."""
+        x1, y1, x2, y2 = (float(v) for v in box)
+        band_y0, band_y1, page_y0 = self._band(y1, y2)
+        y1, y2 = max(y1, band_y0), min(y2, band_y1)
+        scale = 72 / self.dpi
+        return [x1 * scale, page_y0 + (y1 - band_y0) * scale, x2 * scale, page_y0 + (y2 - band_y0) * scale]
+
+    def crop(self, box, padding=0.25):
+        """Return ``box`` (x1, y1, x2, y2 in pixels of ``image``) at full resolution."""
+        x1, y1, x2, y2 = (float(v) for v in box)
+        band_y0, band_y1, page_y0 = self._band(y1, y2)
+        full_resolution = self.dpi >= self.rasterizer.dpi
+        if not full_resolution:
+            # Proxy boxes are coarse, so grow them a little before re-rendering.
+            pad = max(padding * (y2 - y1), 2.0)
+            x1, y1, x2, y2 = x1 - pad, y1 - pad, x2 + pad, y2 + pad
+        x1, x2 = max(x1, 0), min(x2, self.image.shape[1])
+        y1, y2 = max(y1, band_y0), min(y2, band_y1)
+        if full_resolution:
+            return self.image[int(y1):int(y2), int(x1):int(x2)]
+        return self.rasterizer.render_clip(self.pdf_path, self.page_num, self.to_points((x1, y1, x2, y2)))
+
+    def clip(self, rect):
+        """Return ``rect`` (x0, y0, x1, y1 in PDF points) of the page at full resolution."""
+        if self.bands or self.dpi < self.rasterizer.dpi:
+            return self.rasterizer.render_clip(self.pdf_path, self.page_num, rect)
+        scale = self.dpi / 72
+        x1, y1, x2, y2 = (max(int(round(v * scale)), 0) for v in rect)
+        return self.image[y1:y2, x1:x2]
+
+    def full_page(self):
+        """The whole page at the same resolution; used when the margin bands find nothing."""
+        return self.rasterizer.render_page(self.pdf_path, self.page_num, self.dpi)
+
+    def thumbnail(self, size=100):
+        if not self.bands:
+            return make_thumbnail(self.image, size)
+        return self.rasterizer.render_thumbnail(self.pdf_path, self.page_num, size)
+
+
+def make_thumbnail(image, size=100):
+    """Downscale a page to fit in a size x size box for the results table."""
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def page_image_name(pdf_path, page_num, extension):
+    """File name for a saved render of a page.
+
+    Keyed on the PDF's full path, size and mtime, so the same page of a
+    same-named PDF in another folder, or of a rescan, is rendered afresh.
+    """
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime)
+    digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:16]
+    return f"{os.path.basename(pdf_path)}_{digest}_{page_num}.{extension}"
+
+
+# PDF rasterizers: both render one page at a time so a folder never has to
+# be converted in full before detection starts. Pages are handed over as BGR
+# arrays (the layout cv2.imread produced) so nothing is encoded to disk on the
+# detection path; files are only written when the viewer asks for one.
+#
+# With ``detect_dpi`` set, pages are rendered as a cheap low-DPI proxy for
+# YOLO (which resizes to imgsz=640 anyway) and only the detected box is
+# rendered at ``dpi`` for OCR.
+#
+# With ``band_fraction`` set, only the top and bottom bands of each page are
+# rendered (page numbers live there); the detector falls back to the full
+# page when the bands come up empty.
+class FitzRasterizer:
+    def __init__(self, dpi=300, detect_dpi=None, band_fraction=None):
+        self.dpi = dpi
+        self.detect_dpi = detect_dpi
+        self.band_fraction = band_fraction
+        # PyMuPDF is not thread-safe; the renderer thread and clip requests
+        # from the detector take turns.
+        self.lock = threading.Lock()
+
+    @functools.cached_property
+    def fitz(self):
+        # Imported on first use, so creating a rasterizer costs nothing at start-up.
+        import fitz  # PyMuPDF
+        return fitz
+
+    def page_count(self, pdf_path):
+        with self.lock, self.fitz.open(pdf_path) as doc:
+            return doc.page_count
+
+    def _pixmap(self, page, dpi, clip=None):
+        return page.get_pixmap(matrix=self.fitz.Matrix(dpi / 72, dpi / 72), colorspace=self.fitz.csRGB,
+                               alpha=False, clip=clip)
+
+    def _to_array(self, pix):
+        rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    def _render(self, pdf_path, page_num, page, dpi, band_fraction=None):
+        if not band_fraction:
+            return PageImage(pdf_path, page_num, self._to_array(self._pixmap(page, dpi)), dpi, self)
+
+        rect = page.rect
+        band_height = rect.height * band_fraction
+        strips, bands, image_y = [], [], 0
+        for page_y0 in (rect.y0, rect.y1 - band_height):
+            clip = self.fitz.Rect(rect.x0, page_y0, rect.x1, page_y0 + band_height)
+            strip = self._to_array(self._pixmap(page, dpi, clip=clip))
+            bands.append((image_y, image_y + strip.shape[0], page_y0))
+            strips.append(strip)
+            image_y += strip.shape[0]
+        return PageImage(pdf_path, page_num, np.vstack(strips), dpi, self, bands)
+
+    def __reduce__(self):
+        # Rebuilt from settings in pool workers (modules and locks don't pickle).
+        return FitzRasterizer, (self.dpi, self.detect_dpi, self.band_fraction)
+
+    def iter_pages(self, pdf_path, page_nums=None):
+        dpi = self.detect_dpi or self.dpi
+        with self.lock:
+            doc = self.fitz.open(pdf_path)
+        try:
+            for page_num in (range(doc.page_count) if page_nums is None else page_nums):
+                with self.lock:
+                    page = self._render(pdf_path, page_num, doc[page_num], dpi, self.band_fraction)
+                yield page
+        finally:
+            with self.lock:
+                doc.close()
+
+    def render_page(self, pdf_path, page_num, dpi=None):
+        """Render a whole page as a PageImage (no margin bands)."""
+        with self.lock, self.fitz.open(pdf_path) as doc:
+            return self._render(pdf_path, page_num, doc[page_num], dpi or self.dpi)
+
+    def render_thumbnail(self, pdf_path, page_num, size=100):
+        with self.lock, self.fitz.open(pdf_path) as doc:
+            page = doc[page_num]
+            # Render just big enough for a clean downscale to ``size``.
+            dpi = 2 * size * 72 / max(page.rect.width, page.rect.height)
+            return make_thumbnail(self._to_array(self._pixmap(page, dpi)), size)
+
+    def render_clip(self, pdf_path, page_num, rect):
+        """Render ``rect`` (x0, y0, x1, y1 in PDF points) of a page at full DPI."""
+        with self.lock, self.fitz.open(pdf_path) as doc:
+            page = doc[page_num]
+            return self._to_array(self._pixmap(page, self.dpi, clip=self.fitz.Rect(rect) & page.rect))
+
+    def save_page(self, pdf_path, page_num, temp_dir):
+        image_path = os.path.join(temp_dir, page_image_name(pdf_path, page_num, 'png'))
+        if not os.path.exists(image_path):
+            with self.lock, self.fitz.open(pdf_path) as doc:
+                self._pixmap(doc[page_num], self.dpi).save(image_path)
+        return image_path
+
+
+class Pdf2ImageRasterizer:
+    def __init__(self, dpi=300, detect_dpi=None, band_fraction=None, chunk_size=4):
+        self.dpi = dpi
+        self.detect_dpi = detect_dpi
+        # pdftoppm has no clip option here, so bands are cut from a full
+        # render: it saves memory and inference, not rendering time.
+        self.band_fraction = band_fraction
+        # Pages converted per pdftoppm call; keeps memory bounded while
+        # still amortising the process start-up cost.
+        self.chunk_size = chunk_size
+
+    @functools.cached_property
+    def pdf2image(self):
+        import pdf2image
+        return pdf2image
+
+    def page_count(self, pdf_path):
+        return self.pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+
+    def _convert(self, pdf_path, first, last, dpi=None):
+        return self.pdf2image.convert_from_path(pdf_path, dpi=dpi or self.dpi, first_page=first, last_page=last,
+                                                thread_count=self.chunk_size)
+
+    def _to_array(self, img):
+        return cv2.cvtColor(np.asarray(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+    def _page_image(self, pdf_path, page_num, img, dpi, band_fraction=None):
+        image = self._to_array(img)
+        if not band_fraction:
+            return PageImage(pdf_path, page_num, image, dpi, self)
+
+        height = image.shape[0]
+        band_height = int(round(height * band_fraction))
+        bands = [(0, band_height, 0.0), (band_height, 2 * band_height, (height - band_height) * 72 / dpi)]
+        return PageImage(pdf_path, page_num, np.vstack([image[:band_height], image[height - band_height:]]),
+                         dpi, self, bands)
+
+    def __reduce__(self):
+        return Pdf2ImageRasterizer, (self.dpi, self.detect_dpi, self.band_fraction, self.chunk_size)
+
+    def iter_pages(self, pdf_path, page_nums=None):
+        dpi = self.detect_dpi or self.dpi
+        page_nums = list(range(self.page_count(pdf_path)) if page_nums is None else page_nums)
+        for start in range(0, len(page_nums), self.chunk_size):
+            chunk = page_nums[start:start + self.chunk_size]
+            # One pdftoppm call per run of consecutive pages.
+            if chunk[-1] - chunk[0] + 1 == len(chunk):
+                images = self._convert(pdf_path, chunk[0] + 1, chunk[-1] + 1, dpi)
+            else:
+                images = [self._convert(pdf_path, page_num + 1, page_num + 1, dpi)[0] for page_num in chunk]
+            for page_num, img in zip(chunk, images):
+                yield self._page_image(pdf_path, page_num, img, dpi, self.band_fraction)
+
+    def render_page(self, pdf_path, page_num, dpi=None):
+        """Render a whole page as a PageImage (no margin bands)."""
+        dpi = dpi or self.dpi
+        return self._page_image(pdf_path, page_num, self._convert(pdf_path, page_num + 1, page_num + 1, dpi)[0], dpi)
+
+    def render_thumbnail(self, pdf_path, page_num, size=100):
+        img = self.pdf2image.convert_from_path(pdf_path, first_page=page_num + 1, last_page=page_num + 1,
+                                               size=2 * size)[0]
+        return make_thumbnail(self._to_array(img), size)
+
+    def render_clip(self, pdf_path, page_num, rect):
+        """Render ``rect`` (x0, y0, x1, y1 in PDF points) of a page at full DPI.
+
+        pdftoppm cropping is not exposed by pdf2image, so the page is
+        rendered in full and the region cut out of it.
+        """
+        img = self._convert(pdf_path, page_num + 1, page_num + 1)[0]
+        scale = self.dpi / 72
+        return self._to_array(img.crop(tuple(int(round(v * scale)) for v in rect)))
+
+    def save_page(self, pdf_path, page_num, temp_dir):
+        image_path = os.path.join(temp_dir, page_image_name(pdf_path, page_num, 'jpg'))
+        if not os.path.exists(image_path):
+            self._convert(pdf_path, page_num + 1, page_num + 1)[0].save(image_path, "JPEG")
+        return image_path
+
+
+class StopToken:
+    """Cooperative cancel and pause for a run, checked between pages.
+
+    Nothing is interrupted mid-page: the pipeline calls checkpoint() between
+    batches, so a stop or pause takes effect once the pages in flight are
+    done, and those results are still delivered.
+    """
+    def __init__(self):
+        self._stopped = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set()
+
+    def pause(self):
+        if not self._stopped.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def is_stopped(self):
+        return self._stopped.is_set()
+
+    def is_paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        """Block while paused; return False once the run should stop."""
+        self._running.wait()
+        return not self._stopped.is_set()
+
+
+def stream_pages(jobs, rasterizer, max_pending=4, stats=None):
+    """Rasterize on a background thread and yield PageImages in order.
+
+    ``jobs`` is a list of (pdf_path, page_nums) pairs; page_nums None means
+    every page of that PDF.
+
+    At most ``max_pending`` rendered pages wait for the consumer, so the
+    renderer stays just ahead of detection instead of running away with
+    the whole folder. With a StageStats, rendering is timed as 'rasterize'
+    and the queue depth is sampled as 'render_queue'.
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    finished = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for pdf_path, page_nums in jobs:
+                pages = rasterizer.iter_pages(pdf_path, page_nums)
+                if stats is not None:
+                    pages = stats.timed_iter(pages, 'rasterize')
+                for page in pages:
+                    if not put(page):
+                        return
+        except Exception as e:
+            put(e)
+        finally:
+            put(finished)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            if stats is not None:
+                stats.sample('render_queue', pending.qsize())
+            item = pending.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def batched(items, size):
+    """Group an iterable into lists of at most ``size`` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def detect_pages(jobs, detector, rasterizer, thumb_size=100, token=None, stats=None):
+    """Yield (pdf_path, page_num, page_number, thumbnail, box, confidence) for every page in ``jobs``.
+
+    Pages are collected into batches of ``detector.batch_size`` before
+    inference; the renderer keeps filling the next batch meanwhile. No
+    thumbnails are made when ``thumb_size`` is None. A StopToken is checked
+    before each batch.
+    """
+    pages = stream_pages(jobs, rasterizer, max_pending=2 * detector.batch_size, stats=stats)
+    for batch in batched(pages, detector.batch_size):
+        if token is not None and not token.checkpoint():
+            pages.close()
+            return
+        details = detector.detect_batch_details(batch)
+        for page, (page_number, box, confidence) in zip(batch, details):
+            thumbnail = None
+            if thumb_size:
+                with _timer(stats, 'thumbnail'):
+                    thumbnail = page.thumbnail(thumb_size)
+            yield page.pdf_path, page.page_num, page_number, thumbnail, box, confidence
+
+
+def detection_params(rasterizer, recognition_only=True, backend='torch', text_layer=True):
+    """Every setting that changes a page's result; part of the cache key."""
+    return {
+        'backend': resolve_backend(backend),
+        'text_layer': text_layer,
+        'dpi': rasterizer.dpi,
+        'detect_dpi': rasterizer.detect_dpi,
+        'band_fraction': rasterizer.band_fraction,
+        'conf': DETECTION_CONF,
+        'recognition_only': recognition_only,
+        'allowlist': PAGE_NUMBER_ALLOWLIST,
+        'accept_confidence': ACCEPT_CONFIDENCE,
+        'glyph_match': GLYPH_MATCH_THRESHOLD,
+        'sequence_step': MAX_SEQUENCE_STEP,
+        'prior_pages': PRIOR_PAGES,
+        'blank_ink': BLANK_INK_DENSITY,
+        'plate_midtones': PLATE_MIDTONE_SHARE,
+    }
+
+
+# Where a page's answer came from, besides the cache and the job journal:
+# the PDF's own page labels, a number in its header/footer text, or the
+# YOLO + OCR pipeline. Counted per run and written to the journal.
+PAGE_SOURCES = ('page_label', 'margin_text', 'vision')
+
+
+def new_counters():
+    """Per-run tallies shared by the sequential and worker-pool paths."""
+    counters = {'band_pages': 0, 'band_fallbacks': 0, 'cache_hits': 0, 'cache_misses': 0, 'resumed': 0}
+    counters.update((source, 0) for source in PAGE_SOURCES)
+    for tier in TIERS:
+        counters[tier + '_pages'] = 0
+        counters[tier + '_seconds'] = 0.0
+    counters['escalations_resolved'] = 0
+    counters['sequence_confirmed'] = 0
+    counters['location_pages'] = 0
+    counters['location_hits'] = 0
+    counters['blank_pages'] = 0
+    counters['plate_pages'] = 0
+    return counters
+
+
+def source_summary(counters):
+    """How many pages each path answered this run, as one line of text."""
+    return (f"Text layer: {counters['page_label']} pages by page labels, {counters['margin_text']} by margin "
+            f"text; vision: {counters['vision']} pages.")
+
+
+def tier_summary(counters):
+    """Pages and seconds per detection tier this run, as one line of text."""
+    tiers = ", ".join(f"{tier} {counters[tier + '_pages']} pages ({counters[tier + '_seconds']:.1f} s)"
+                      for tier in TIERS)
+    summary = (f"Tiers: {tiers}; {counters['escalations_resolved']} escalated pages resolved, "
+               f"{counters['sequence_confirmed']} pages confirmed from the page sequence without OCR, "
+               f"{counters['blank_pages']} blank pages and {counters['plate_pages']} plates skipped.")
+    if counters['location_pages']:
+        summary += (f" Location prior: {counters['location_hits']} of {counters['location_pages']} pages tried "
+                    f"read without YOLO ({counters['location_hits'] / counters['location_pages']:.0%} hit rate).")
+    return summary
+
+
+def _collect_counters(detector, counters):
+    if counters is not None:
+        counters['band_pages'] += detector.band_pages
+        counters['band_fallbacks'] += detector.band_fallbacks
+        for tier in TIERS:
+            counters[tier + '_pages'] += detector.tier_pages[tier]
+            counters[tier + '_seconds'] += detector.tier_seconds[tier]
+        counters['escalations_resolved'] += detector.escalations_resolved
+        counters['sequence_confirmed'] += detector.sequence_confirmed
+        counters['location_pages'] += detector.location_pages
+        counters['location_hits'] += detector.location_hits
+        counters['blank_pages'] += detector.blank_pages
+        counters['plate_pages'] += detector.plate_pages
+    detector.reset_counters()
+
+
+def _run_cached(pdf_paths, rasterizer, detect_jobs, thumb_size, counters, cache, context, token=None,
+                journal=None, stats=None, text_layer=True):
+    """Serve pages from ``cache`` where possible and send the rest to ``detect_jobs``.
+
+    Yields (done, total, pdf_path, page_num, page_number, thumbnail). Cached
+    pages are never rasterized beyond a thumbnail; only new or changed PDFs
+    (by content hash) reach the detector. Pages a resumed JobJournal already
+    holds are served the same way, and every page's outcome is appended to
+    the journal. With ``text_layer``, pages whose number the PDF's own page
+    labels or margin text give (see text_layer) skip the detector too.
+
+    Only the page counts are read up front. Each PDF is hashed, looked up
+    and read for its text layer when its turn comes: PDFs before the first
+    one with pages to detect are served straight away, and the rest are
+    prepared as ``detect_jobs`` asks for their pages, so this work overlaps
+    with detecting the previous PDF. Their cached pages are served between
+    detected ones.
+    """
+    page_counts = {pdf_path: rasterizer.page_count(pdf_path) for pdf_path in pdf_paths}
+    total = sum(page_counts.values())
+    pdf_hashes = {}
+
+    def prepare(pdf_path):
+        """(cached entries, page_nums left for the detector) of one PDF."""
+        page_count = page_counts[pdf_path]
+        resumed = journal.completed(pdf_path) if journal is not None else {}
+        hits = {}
+        if cache is not None:
+            with _timer(stats, 'cache_lookup'):
+                pdf_hashes[pdf_path] = file_hash(pdf_path)
+                hits = cache.lookup(pdf_hashes[pdf_path], context)
+        hits.update(resumed)
+        missing = [page_num for page_num in range(page_count) if page_num not in hits]
+        cached = [(pdf_path, page_num, hits[page_num], 'journal' if page_num in resumed else 'cache')
+                  for page_num in range(page_count) if page_num in hits]
+        if counters is not None:
+            counters['resumed'] += len(resumed)
+            if cache is not None:
+                counters['cache_hits'] += page_count - len(missing) - len(resumed)
+                counters['cache_misses'] += len(missing)
+
+        if text_layer and missing:
+            # PyMuPDF is not thread-safe; share the rasterizer's lock if it has one.
+            with _timer(stats, 'text_layer'), getattr(rasterizer, 'lock', None) or contextlib.nullcontext():
+                found = read_text_layer(pdf_path, missing)
+            for page_num, (page_number, box, source) in sorted(found.items()):
+                cached.append((pdf_path, page_num, (page_number, box, 1.0), source))
+                if counters is not None:
+                    counters[source] += 1
+            missing = [page_num for page_num in missing if page_num not in found]
+        if counters is not None:
+            counters['vision'] += len(missing)
+        return cached, missing
+
+    # Cached entries wait here until the consuming thread serves them; the
+    # detector's job iterator may prepare PDFs on its renderer thread.
+    ready = collections.deque()
+    done = 0
+    stopped = False
+
+    def serve():
+        nonlocal done, stopped
+        while ready:
+            if token is not None and not token.checkpoint():
+                stopped = True
+                return
+            pdf_path, page_num, (page_number, box, confidence), source = ready.popleft()
+            if cache is not None and source in PAGE_SOURCES:
+                cache.store(pdf_hashes[pdf_path], context, page_num, page_number, box, confidence)
+            if journal is not None and source != 'journal':
+                journal.record(pdf_path, page_num, page_number, box, confidence, source)
+            done += 1
+            thumbnail = None
+            if thumb_size:
+                with _timer(stats, 'thumbnail'):
+                    thumbnail = rasterizer.render_thumbnail(pdf_path, page_num, thumb_size)
+            if stats is not None:
+                stats.add_pages()
+            yield done, total, pdf_path, page_num, page_number, thumbnail
+
+    remaining = iter(pdf_paths)
+    first_job = None
+    for pdf_path in remaining:
+        cached, missing = prepare(pdf_path)
+        ready.extend(cached)
+        yield from serve()
+        if stopped:
+            return
+        if missing:
+            first_job = (pdf_path, missing)
+            break
+
+    def jobs():
+        yield first_job
+        for pdf_path in remaining:
+            cached, missing = prepare(pdf_path)
+            ready.extend(cached)
+            if missing:
+                yield pdf_path, missing
+
+    if first_job is not None:
+        for pdf_path, page_num, page_number, thumbnail, box, confidence in detect_jobs(jobs()):
+            yield from serve()
+            if stopped:
+                return
+            with _timer(stats, 'record'):
+                if cache is not None and not page_number.startswith("Error"):
+                    cache.store(pdf_hashes[pdf_path], context, page_num, page_number, box, confidence)
+                if journal is not None:
+                    journal.record(pdf_path, page_num, page_number, box, confidence, 'vision')
+            if stats is not None:
+                stats.add_pages()
+            done += 1
+            yield done, total, pdf_path, page_num, page_number, thumbnail
+    yield from serve()
+    if stopped:
+        return
+
+    if cache is not None:
+        cache.evict()
+
+
+def process_pdfs(pdf_paths, detector, rasterizer, thumb_size=100, counters=None, cache=None, context=None,
+                 token=None, journal=None, stats=None, text_layer=True):
+    """Yield (done, total, pdf_path, page_num, page_number, thumbnail) as each page finishes.
+
+    With a ResultCache (and the ``context`` hash from ResultCache.context),
+    unchanged pages are answered from the cache. With a StopToken the run
+    can be paused, or stopped early after the current batch. A JobJournal
+    records every page and skips the pages it already holds, and a
+    StageStats collects per-stage timings. ``text_layer`` answers pages
+    from the PDF's text where it can, before any rendering.
+    """
+    detector.reset_counters()
+    detector.new_run()
+    detector.stats = stats
+    try:
+        yield from _run_cached(pdf_paths, rasterizer,
+                               lambda jobs: detect_pages(jobs, detector, rasterizer, thumb_size, token, stats),
+                               thumb_size, counters, cache, context, token, journal, stats, text_layer)
+    finally:
+        detector.stats = None
+        _collect_counters(detector, counters)
+
+
+# Worker-pool execution: every process loads the models once in its
+# initializer and then works through chunks of pages from a shared queue.
+def default_worker_count():
+    # Each worker runs YOLO with its own torch threads and holds its own copy
+    # of the models, so half the logical CPUs is the sweet spot.
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+# How often a run waiting on the pool looks at its StopToken.
+STOP_POLL_SECONDS = 0.2
+
+
+_worker_detector = None
+# Why the worker's models failed to load, if they did; see _init_worker.
+_worker_error = None
+# The run the worker's detector last worked for; see _detect_chunk.
+_worker_run = None
+# The pool's stop Event, set by the parent when a run is stopped.
+_worker_stop = None
+
+
+class _PoolStop:
+    """The StopToken side of a worker: stops a chunk between batches once the run is stopped."""
+    def __init__(self, event):
+        self.event = event
+
+    def checkpoint(self):
+        return not self.event.is_set()
+
+
+def _init_worker(model_path, batch_size, threads, backend, stop):
+    global _worker_detector, _worker_error, _worker_stop
+    cv2.setNumThreads(1)
+    _worker_stop = stop
+    try:
+        _worker_detector = PageNumberDetector(model_path, batch_size, backend=backend, threads=threads)
+    except Exception as e:
+        # Raising here would make the pool respawn the worker forever; every
+        # task raises it instead, so the run and the warm-up see it.
+        _worker_error = f"A worker could not load the models: {e!r}"
+        return
+    # torch is there for the torch backend and EasyOCR, but not imported for its own sake.
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def _check_worker():
+    if _worker_error is not None:
+        raise RuntimeError(_worker_error)
+
+
+def _worker_ready():
+    _check_worker()
+    return True
+
+
+def _detect_chunk(job, rasterizer, thumb_size, run, timed=False):
+    global _worker_run
+    _check_worker()
+    # Workers outlive runs: the first chunk of a new run starts its sequences afresh.
+    if run != _worker_run:
+        _worker_detector.new_run()
+        _worker_run = run
+    stats = StageStats() if timed else None
+    _worker_detector.stats = stats
+    try:
+        results = list(detect_pages([job], _worker_detector, rasterizer, thumb_size, token=_PoolStop(_worker_stop),
+                                    stats=stats))
+    finally:
+        _worker_detector.stats = None
+    counters = new_counters()
+    _collect_counters(_worker_detector, counters)
+    return results, counters, stats.state() if stats is not None else None
+
+
+def start_worker_pool(model_path, workers, batch_size=DEFAULT_BATCH_SIZE, backend='torch'):
+    """Start ``workers`` processes that each load the models once.
+
+    The pool's ``stop_event`` stops the chunks its workers are running
+    between batches; process_pdfs_parallel sets it when a run is stopped.
+    """
+    # Fail early on the commonest cause; other load errors come back from
+    # the workers' tasks (see _init_worker).
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model weights not found: {model_path}")
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    backend = resolve_backend(backend)
+    if backend != 'torch':
+        # Exported once here rather than by every worker at the same time.
+        model_path = export_onnx(model_path, int8=backend == 'onnx-int8')
+    # spawn rather than fork: the parent already runs Qt and torch threads.
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    pool = context.Pool(workers, initializer=_init_worker,
+                        initargs=(model_path, batch_size, threads, backend, stop_event))
+    pool.stop_event = stop_event
+    return pool
+
+
+def process_pdfs_parallel(pdf_paths, pool, rasterizer, thumb_size=100, counters=None, cache=None, context=None,
+                          chunk_pages=16, max_in_flight=8, token=None, journal=None, stats=None, text_layer=True):
+    """Like process_pdfs, but spread over the processes of ``pool``.
+
+    PDFs are split into chunks of ``chunk_pages`` pages so a few large books
+    still keep every worker busy. Results come back as chunks finish, so
+    they are not in page order.
+
+    At most ``max_in_flight`` chunks are queued on the pool at a time. When
+    the StopToken is paused or stopped, no new chunks are handed out. After
+    a pause the ones already running finish and are delivered. A stop also
+    sets the pool's stop_event (see start_worker_pool), so running chunks
+    end after their current batch, and the run ends as soon as no result
+    has come in for STOP_POLL_SECONDS, without waiting for the rest (or for
+    workers that never answer).
+    """
+    def detect_jobs(jobs):
+        # Lazy, so the next PDF is only prepared when its first chunk is due.
+        chunks = ((pdf_path, page_nums[first:first + chunk_pages])
+                  for pdf_path, page_nums in jobs for first in range(0, len(page_nums), chunk_pages))
+        detect_chunk = functools.partial(_detect_chunk, rasterizer=rasterizer, thumb_size=thumb_size,
+                                         run=uuid.uuid4().hex, timed=stats is not None)
+        finished = queue.Queue()
+        in_flight = 0
+        remaining = True
+        pool.stop_event.clear()
+        try:
+            while True:
+                if token is not None and token.is_stopped():
+                    # Chunks already running end after their current batch.
+                    pool.stop_event.set()
+                    remaining = False
+                while remaining and in_flight < max_in_flight and (token is None or not token.is_paused()):
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        remaining = False
+                        break
+                    pool.apply_async(detect_chunk, (chunk,), callback=finished.put, error_callback=finished.put)
+                    in_flight += 1
+                if not in_flight:
+                    if remaining and token is not None and token.checkpoint():
+                        continue
+                    return
+
+                if stats is not None:
+                    stats.sample('chunks_in_flight', in_flight)
+                try:
+                    outcome = finished.get(timeout=STOP_POLL_SECONDS)
+                except queue.Empty:
+                    if token is not None and token.is_stopped():
+                        return  # chunks still running are dropped; their pages are redone next run
+                    continue
+                in_flight -= 1
+                if isinstance(outcome, BaseException):
+                    raise outcome
+                results, chunk_counters, chunk_stats = outcome
+                if counters is not None:
+                    for key, value in chunk_counters.items():
+                        counters[key] += value
+                if chunk_stats is not None:
+                    stats.merge(chunk_stats)
+                yield from results
+        finally:
+            if in_flight:
+                # Stopped, failed or abandoned: don't leave chunks working for nobody.
+                pool.stop_event.set()
+
+    yield from _run_cached(pdf_paths, rasterizer, detect_jobs, thumb_size, counters, cache, context, token, journal,
+                           stats, text_layer)
+
+
+class ModelHolder:
+    """Loads the models once per application and shares them between runs.
+
+    start(workers) warms, on a background thread, what a run with that many
+    workers uses: the in-process detector for 1, the worker pool otherwise.
+    So the GUI never waits for weights, and only what the run needs is
+    loaded. get() blocks the calling (worker) thread until the detector is
+    ready. Worker pools are kept alive between runs as well and only
+    restarted when the worker count changes.
+    """
+    def __init__(self, model_path, batch_size=DEFAULT_BATCH_SIZE, backend='auto'):
+        self.model_path = model_path
+        self.batch_size = batch_size
+        # Decided once at startup; 'auto' prefers onnxruntime when installed.
+        self.backend = resolve_backend(backend)
+        # YOLO and EasyOCR are not re-entrant: one run uses the detector at a time.
+        self.lock = threading.Lock()
+        # Guards the fields below and is only ever held briefly, so start()
+        # and close() on the GUI thread never wait on a pool being built.
+        self._state_lock = threading.Lock()
+        # Held while a pool is built or replaced (ONNX export, spawning);
+        # only background and run threads take it.
+        self._pool_lock = threading.RLock()
+        self._closed = False
+        self._loaded = threading.Event()
+        self._loader = None
+        self._detector = None
+        self._error = None
+        self._pool = None
+        self._pool_workers = 0
+        # Worker count -> Event set once its pool answered, and load errors.
+        self._pool_ready = {}
+        self._pool_errors = {}
+        # Worker count the newest start() asked a pool for; older warm-ups
+        # give way to it.
+        self._wanted = 0
+
+    def start(self, workers=1):
+        with self._state_lock:
+            if workers <= 1:
+                if self._loader is None:
+                    self._loader = threading.Thread(target=self._load, daemon=True)
+                    self._loader.start()
+            else:
+                self._wanted = workers
+                if workers not in self._pool_ready:
+                    ready = self._pool_ready[workers] = threading.Event()
+                    threading.Thread(target=self._warm_pool, args=(workers, ready), daemon=True).start()
+
+    def _load(self):
+        try:
+            self._detector = PageNumberDetector(self.model_path, self.batch_size, backend=self.backend)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._loaded.set()
+
+    def _warm_pool(self, workers, ready):
+        try:
+            with self._pool_lock:
+                if self._wanted != workers:
+                    # Another count was chosen while this one waited its turn.
+                    self._end_warm(workers, ready, superseded=True)
+                    return
+                pool = self.pool(workers)
+            # Workers run their initializer (the model load) before any task.
+            pending = pool.apply_async(_worker_ready)
+            while not pending.ready():
+                pending.wait(STOP_POLL_SECONDS)
+                if self._pool is not pool:
+                    # Replaced or closed meanwhile: the answer would never come.
+                    self._end_warm(workers, ready, superseded=True)
+                    return
+            pending.get()
+        except Exception as e:
+            self._end_warm(workers, ready, error=e)
+        else:
+            self._end_warm(workers, ready)
+
+    def _end_warm(self, workers, ready, error=None, superseded=False):
+        with self._state_lock:
+            if self._pool_ready.get(workers) is not ready:
+                return  # its pool was replaced, which dropped the entry already
+            if superseded:
+                del self._pool_ready[workers]
+                return
+            if error is not None:
+                self._pool_errors[workers] = error
+            ready.set()
+
+    def is_loaded(self, workers=1):
+        if workers <= 1:
+            return self._loaded.is_set()
+        ready = self._pool_ready.get(workers)
+        return ready is not None and ready.is_set()
+
+    def error(self, workers=1):
+        """The exception loading (for a run with ``workers``) failed with, or None."""
+        return self._error if workers <= 1 else self._pool_errors.get(workers)
+
+    def get(self):
+        self.start()
+        self._loaded.wait()
+        if self._error is not None:
+            raise self._error
+        return self._detector
+
+    def pool(self, workers):
+        with self._pool_lock:
+            with self._state_lock:
+                if self._closed:
+                    raise RuntimeError("The models were closed")
+                if self._pool is not None and self._pool_workers == workers:
+                    return self._pool
+                old, self._pool = self._pool, None
+                if old is not None:
+                    self._pool_ready.pop(self._pool_workers, None)
+                    self._pool_errors.pop(self._pool_workers, None)
+            if old is not None:
+                old.terminate()
+            pool = start_worker_pool(self.model_path, workers, self.batch_size, self.backend)
+            with self._state_lock:
+                if not self._closed:
+                    self._pool, self._pool_workers = pool, workers
+                    return pool
+            # close() ran while the pool was starting.
+            pool.terminate()
+            raise RuntimeError("The models were closed")
+
+    def close(self):
+        with self._state_lock:
+            self._closed = True
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def list_pdfs(folder_path):
+    """PDFs directly inside folder_path, in name order."""
+    return [os.path.join(folder_path, name) for name in sorted(os.listdir(folder_path))
+            if name.lower().endswith('.pdf')]
+
+
+def scan_pdfs(pdf_paths, models, rasterizer, workers=1, thumb_size=100, counters=None, cache=None, token=None,
+              journal=None, stats=None, text_layer=True):
+    """Detect every page of pdf_paths; the entry point the GUI and the CLI share.
+
+    Runs in-process on the ModelHolder's detector when ``workers`` is 1 and
+    on its worker pool otherwise, consulting ``cache`` (a ResultCache) when
+    given, honouring ``token`` (a StopToken) for pause and cancel, and
+    recording to and resuming from ``journal`` (a JobJournal), and timing
+    every stage into ``stats`` (a StageStats). Pages the PDF's own text
+    answers never reach the models unless ``text_layer`` is False. Yields
+    the same tuples as process_pdfs, as pages complete.
+    """
+    context = None
+    if cache is not None:
+        context = cache.context(models.model_path, detection_params(rasterizer, backend=models.backend,
+                                                                         text_layer=text_layer))
+
+    if workers > 1:
+        yield from process_pdfs_parallel(pdf_paths, models.pool(workers), rasterizer, thumb_size,
+                                         counters=counters, cache=cache, context=context,
+                                         max_in_flight=2 * workers, token=token, journal=journal, stats=stats,
+                                         text_layer=text_layer)
+        return
+
+    detector = models.get()
+    with models.lock:
+        yield from process_pdfs(pdf_paths, detector, rasterizer, thumb_size,
+                                counters=counters, cache=cache, context=context, token=token, journal=journal,
+                                stats=stats, text_layer=text_layer)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pagedetect", "results_cache.sqlite")
+# Rows are ~100 bytes, so this holds results for a few hundred thousand pages.
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Persistent per-page detection results, addressed by content.
+
+    A row is keyed by the PDF's content hash, the page index and a context
+    hash covering the model weights and every detection parameter, so a
+    renamed PDF still hits and a retrained model or changed setting misses.
+    Least recently used rows are evicted once the database grows past
+    ``max_bytes``.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_CACHE_BYTES):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._weights_hashes = {}
+        # Used from the processing thread, created on the GUI thread.
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS page_results (
+                               pdf_hash TEXT NOT NULL,
+                               page_num INTEGER NOT NULL,
+                               context TEXT NOT NULL,
+                               page_number TEXT NOT NULL,
+                               box TEXT,
+                               confidence REAL,
+                               last_used REAL NOT NULL,
+                               PRIMARY KEY (pdf_hash, page_num, context))""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS page_results_last_used ON page_results (last_used)")
+        self.db.commit()
+
+    def context(self, model_path, params):
+        """Hash of the model weights plus the detection parameters."""
+        stat = os.stat(model_path)
+        key = (os.path.abspath(model_path), stat.st_size, stat.st_mtime)
+        if key not in self._weights_hashes:
+            self._weights_hashes[key] = file_hash(model_path)
+        payload = self._weights_hashes[key] + json.dumps(params, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def lookup(self, pdf_hash, context):
+        """Return {page_num: (page_number, box, confidence)} for one PDF."""
+        with self.lock:
+            rows = self.db.execute("SELECT page_num, page_number, box, confidence FROM page_results "
+                                   "WHERE pdf_hash = ? AND context = ?", (pdf_hash, context)).fetchall()
+            if rows:
+                self.db.execute("UPDATE page_results SET last_used = ? WHERE pdf_hash = ? AND context = ?",
+                                (time.time(), pdf_hash, context))
+                self.db.commit()
+        return {page_num: (page_number, json.loads(box) if box else None, confidence)
+                for page_num, page_number, box, confidence in rows}
+
+    def store(self, pdf_hash, context, page_num, page_number, box, confidence):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO page_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (pdf_hash, page_num, context, page_number,
+                             json.dumps([float(v) for v in box]) if box is not None else None,
+                             confidence, time.time()))
+            self.db.commit()
+
+    def size_bytes(self):
+        with self.lock:
+            page_size = self.db.execute("PRAGMA page_size").fetchone()[0]
+            page_count = self.db.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = self.db.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def evict(self):
+        """Drop the least recently used quarter of the rows until under max_bytes."""
+        while self.size_bytes() > self.max_bytes:
+            with self.lock:
+                rows = self.db.execute("SELECT COUNT(*) FROM page_results").fetchone()[0]
+                if not rows:
+                    return
+                self.db.execute("DELETE FROM page_results WHERE rowid IN (SELECT rowid FROM page_results "
+                                "ORDER BY last_used LIMIT ?)", (max(1, rows // 4),))
+                self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
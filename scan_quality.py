@@ -0,0 +1,145 @@
+import math
+import multiprocessing
+
+import cv2
+import numpy as np
+
+
+# Scans below this effective resolution are reported in the book-wise results.
+MIN_DPI = 300
+# Images covering less of the page than this (logos, stamps, ornaments)
+# don't decide its resolution.
+MIN_IMAGE_COVERAGE = 0.25
+# Images covering at least this share of what the largest one covers count
+# as layers of the same scan (see page_dpi).
+SCAN_LAYER_COVERAGE = 0.9
+# Pre-check: pages are judged on a grayscale copy at most PRECHECK_SIZE
+# pixels on a side, with the outer PRECHECK_TRIM of each edge (scanner
+# borders, shadows of the binding) left out.
+PRECHECK_SIZE = 256
+PRECHECK_TRIM = 0.03
+# Ink is anything this much darker than the paper (the 90th percentile of
+# the page), so bleed-through and yellowed paper don't count.
+INK_CONTRAST = 80
+# A blank page has less ink than BLANK_INK_DENSITY of its area, and its top
+# and bottom margins (where a lone page number would be) less than
+# BLANK_BAND_INK of theirs.
+BLANK_INK_DENSITY = 0.002
+BLANK_BAND_INK = 0.0002
+# A plate is mostly mid-tones (a photograph or engraving, not black text
+# on paper) and has nothing printed in its top and bottom margins, whose
+# tone varies by less than PLATE_BAND_STD.
+PLATE_MIDTONE_SHARE = 0.3
+PLATE_BAND_STD = 8.0
+# What the pre-check reports for such pages in place of a page number.
+BLANK_PAGE = "Blank page"
+PLATE_PAGE = "Plate page"
+PAGE_KINDS = (BLANK_PAGE, PLATE_PAGE)
+
+
+def _page_tone(image):
+    """How much darker than the paper each pixel of ``image`` is, downsampled and trimmed."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    step = int(math.ceil(max(gray.shape[:2]) / PRECHECK_SIZE))
+    if step > 1:
+        # Minimum over step x step blocks (a minimum filter, then every
+        # step-th pixel), so thin strokes survive the downsampling.
+        gray = cv2.erode(gray, np.ones((step, step), np.uint8))[step // 2::step, step // 2::step]
+    trim_y, trim_x = int(gray.shape[0] * PRECHECK_TRIM), int(gray.shape[1] * PRECHECK_TRIM)
+    gray = gray[trim_y:gray.shape[0] - trim_y, trim_x:gray.shape[1] - trim_x].astype(np.float32)
+    return np.percentile(gray, 90) - gray
+
+
+def has_ink(image, density=BLANK_BAND_INK):
+    """True when at least ``density`` of ``image`` (a page or part of one) is ink."""
+    if image is None or not image.size:
+        return False
+    return (_page_tone(image) > INK_CONTRAST).mean() >= density
+
+
+def classify_page(image, band_fraction=0.12):
+    """BLANK_PAGE or PLATE_PAGE when a whole-page image can carry no page number, else None.
+
+    ``band_fraction`` is the share of the page height, top and bottom, that
+    must be empty. Anything uncertain is None and goes to the detector.
+    """
+    if image is None or not image.size:
+        return None
+    tone = _page_tone(image)
+    band = max(1, int(tone.shape[0] * band_fraction))
+    margins = np.concatenate([tone[:band], tone[-band:]])
+    if (margins > INK_CONTRAST).mean() >= BLANK_BAND_INK:
+        return None
+    if (tone > INK_CONTRAST).mean() < BLANK_INK_DENSITY:
+        return BLANK_PAGE
+    midtones = ((tone > INK_CONTRAST / 4) & (tone <= 2 * INK_CONTRAST)).mean()
+    if midtones >= PLATE_MIDTONE_SHARE and margins.std() < PLATE_BAND_STD:
+        return PLATE_PAGE
+    return None
+
+
+def page_dpi(page):
+    """Effective DPI of the scan on a fitz page, from its image placements.
+
+    The pixel size of every image drawn on the page is divided by the size
+    it is drawn at, so nothing is rendered. Pages without a large image
+    (born-digital text) have no scan resolution and give None.
+
+    Compressed (MRC) scans store a page as several full-page layers, with
+    the background deliberately downsampled; the text layer carries the
+    scan's real resolution. So the page's DPI is the highest among the
+    images covering (nearly) as much of it as the largest one.
+    """
+    page_area = page.rect.width * page.rect.height
+    layers = []
+    for info in page.get_image_info():
+        bbox = info['bbox']
+        covered = max(0.0, min(bbox[2], page.rect.x1) - max(bbox[0], page.rect.x0)) * \
+            max(0.0, min(bbox[3], page.rect.y1) - max(bbox[1], page.rect.y0))
+        if not page_area or covered < MIN_IMAGE_COVERAGE * page_area:
+            continue
+        # The transform maps the image's unit square onto the page, so its
+        # column lengths are the drawn width and height in points, whatever
+        # the rotation.
+        a, b, c, d = info['transform'][:4]
+        drawn_width, drawn_height = math.hypot(a, b) / 72, math.hypot(c, d) / 72
+        if drawn_width and drawn_height:
+            layers.append((covered, min(info['width'] / drawn_width, info['height'] / drawn_height)))
+    if not layers:
+        return None
+    largest = max(covered for covered, _ in layers)
+    return round(max(dpi for covered, dpi in layers if covered >= SCAN_LAYER_COVERAGE * largest))
+
+
+def book_dpis(pdf_path):
+    """Effective DPI of every page of a PDF, in page order; None if it can't be read."""
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as doc:
+            return [page_dpi(page) for page in doc]
+    except Exception:
+        return None
+
+
+class DpiScan:
+    """Reads the page DPIs of a set of PDFs in a separate process.
+
+    Meant to run alongside detection: it only parses the page content, so
+    it finishes long before the detector does. ``callback(pdf_path, dpis)``
+    is called from a pool thread as each book is read. close() waits for
+    the remaining books, terminate() drops them.
+    """
+    def __init__(self, pdf_paths, callback):
+        # PyMuPDF is not thread-safe, and the rasterizer uses it already.
+        self.pool = multiprocessing.get_context('spawn').Pool(1)
+        for pdf_path in pdf_paths:
+            self.pool.apply_async(book_dpis, (pdf_path,),
+                                  callback=lambda dpis, pdf_path=pdf_path: callback(pdf_path, dpis))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
@@ -0,0 +1,168 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Spans kept for the Chrome trace; per-stage durations are always kept.
+MAX_SPANS = 200000
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unknown."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes.
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+    except Exception:
+        return None
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+class StageStats:
+    """Per-stage timings, gauges and page throughput for one run.
+
+    Stages are timed with timer() (or timed_iter() for a generator) and
+    gauges such as queue depths are sampled with sample(). Timestamps are
+    wall-clock based so spans recorded in worker processes line up with the
+    parent's once merged with merge(). Safe to use from several threads.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = []
+        self.durations = {}
+        self.gauges = {}
+        self.pages = 0
+        self.peak_rss = {}
+        self._wall0 = time.time()
+        self._perf0 = time.perf_counter()
+        self.started = self.now()
+
+    def now(self):
+        return self._wall0 + time.perf_counter() - self._perf0
+
+    def add_span(self, stage, start, duration, pid=None, tid=None):
+        with self.lock:
+            self.durations.setdefault(stage, []).append(duration)
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append((stage, start, duration, pid or os.getpid(), tid or threading.get_ident()))
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.add_span(stage, start, self.now() - start)
+
+    def timed_iter(self, iterable, stage):
+        """Yield from ``iterable``, timing the production of each item as ``stage``."""
+        iterator = iter(iterable)
+        while True:
+            start = self.now()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add_span(stage, start, self.now() - start)
+            yield item
+
+    def sample(self, name, value):
+        with self.lock:
+            self.gauges.setdefault(name, []).append(value)
+
+    def add_pages(self, count=1):
+        with self.lock:
+            self.pages += count
+
+    def record_rss(self):
+        peak = peak_rss_bytes()
+        if peak is not None:
+            with self.lock:
+                self.peak_rss[os.getpid()] = max(peak, self.peak_rss.get(os.getpid(), 0))
+
+    def state(self):
+        """Picklable snapshot, for sending a worker's stats to the parent."""
+        self.record_rss()
+        with self.lock:
+            return {'spans': list(self.spans), 'gauges': dict(self.gauges), 'peak_rss': dict(self.peak_rss)}
+
+    def merge(self, state):
+        for stage, start, duration, pid, tid in state['spans']:
+            self.add_span(stage, start, duration, pid, tid)
+        with self.lock:
+            for name, values in state['gauges'].items():
+                self.gauges.setdefault(name, []).extend(values)
+            for pid, peak in state['peak_rss'].items():
+                self.peak_rss[pid] = max(peak, self.peak_rss.get(pid, 0))
+
+    def summary(self):
+        """Dict of per-stage count/total/p50/p95 (seconds), gauges, pages/s and peak RSS."""
+        self.record_rss()
+        with self.lock:
+            elapsed = max(self.now() - self.started, 1e-6)
+            return {
+                'elapsed': elapsed,
+                'pages': self.pages,
+                'pages_per_second': self.pages / elapsed,
+                'stages': {stage: {'count': len(values), 'total': sum(values),
+                                   'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95)}
+                           for stage, values in self.durations.items()},
+                'gauges': {name: {'mean': sum(values) / len(values), 'max': max(values)}
+                           for name, values in self.gauges.items()},
+                'peak_rss': dict(self.peak_rss),
+            }
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_chrome_trace(self, path):
+        """Write the spans in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        with self.lock:
+            events = [{'name': stage, 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6, 'pid': pid, 'tid': tid}
+                      for stage, start, duration, pid, tid in self.spans]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def format_summary(summary):
+    """Plain-text table of a StageStats summary, for the GUI panel and the CLI."""
+    lines = [f"{summary['pages']} pages in {summary['elapsed']:.1f} s, {summary['pages_per_second']:.2f} pages/s"]
+    lines.append(f"{'stage':<16}{'count':>8}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, times in sorted(summary['stages'].items(), key=lambda item: -item[1]['total']):
+        lines.append(f"{stage:<16}{times['count']:>8}{times['total']:>10.2f}"
+                     f"{times['p50'] * 1000:>10.1f}{times['p95'] * 1000:>10.1f}")
+    for name, values in sorted(summary['gauges'].items()):
+        lines.append(f"{name}: mean {values['mean']:.1f}, max {values['max']}")
+    if summary['peak_rss']:
+        lines.append("peak RSS: " + ", ".join(f"{peak / 2**20:.0f} MB (pid {pid})"
+                                              for pid, peak in sorted(summary['peak_rss'].items())))
+    return "\n".join(lines)
@@ -0,0 +1,66 @@
+from book_report import book_wise_results, drop_misreads, dpi_check_text
+from scan_quality import BLANK_PAGE, PLATE_PAGE
+
+
+def rows(*page_numbers, pdf_path="/books/book.pdf"):
+    return [(pdf_path, page_num, page_number) for page_num, page_number in enumerate(page_numbers)]
+
+
+def test_unread_pages_inside_a_run_are_no_gap():
+    details = book_wise_results(rows("1", "2", "No page number detected", "4", "5"))["book"]
+    assert details['missing_pages'] == []
+    assert details['undetected_pages'] == [3]
+    assert details['detected_pages'] == [1, 2, 4, 5]
+
+
+def test_jump_in_the_count_is_missing():
+    details = book_wise_results(rows("1", "2", "3", "6", "7"))["book"]
+    assert details['missing_pages'] == [4, 5]
+    assert details['in_order_pages'] == []
+
+
+def test_numbers_before_the_first_read():
+    details = book_wise_results(rows("4", "5"))["book"]
+    assert details['missing_pages'] == [1, 2, 3]
+
+
+def test_misread_is_suspect_not_a_gap():
+    details = book_wise_results(rows("1", "2", "71", "4", "5"))["book"]
+    assert details['suspect_pages'] == [(3, 71)]
+    assert details['missing_pages'] == []
+    assert details['in_order_pages'] == []
+
+
+def test_reordered_pages():
+    details = book_wise_results(rows("1", "2", "5", "3", "4"))["book"]
+    assert details['in_order_pages'] == [3]
+
+
+def test_blank_and_plate_pages():
+    details = book_wise_results(rows("1", BLANK_PAGE, "3", PLATE_PAGE, "4"))["book"]
+    assert details['blank_pages'] == [2]
+    assert details['plate_pages'] == [4]
+    assert details['missing_pages'] == []
+
+
+def test_books_are_kept_apart():
+    results = book_wise_results(rows("1", "2", pdf_path="/a/first.pdf") + rows("7", "8", pdf_path="/a/second.pdf"))
+    assert results["first"]['missing_pages'] == []
+    assert results["second"]['missing_pages'] == [1, 2, 3, 4, 5, 6]
+
+
+def test_drop_misreads():
+    reads = [(0, 1), (1, 2), (2, 71), (3, 4), (4, 5)]
+    assert drop_misreads(reads) == ([(0, 1), (1, 2), (3, 4), (4, 5)], [(2, 71)])
+    # Neighbours that disagree with each other leave the read alone.
+    assert drop_misreads([(0, 1), (1, 2), (2, 9)]) == ([(0, 1), (1, 2), (2, 9)], [])
+
+
+def test_dpi_check():
+    pdf_path = "/books/book.pdf"
+    details = book_wise_results(rows("1", "2", "3"), {pdf_path: [400, 200, None]})["book"]
+    assert details['all_pages_above_300dpi'] is False
+    assert details['low_dpi_pages'] == [2]
+    assert details['min_dpi'] == 200
+    assert dpi_check_text(details) == "No: pages 2 (lowest 200 DPI)"
+    assert dpi_check_text(book_wise_results(rows("1"))["book"]) == "Unknown"
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+
+from scan_quality import BLANK_PAGE, PLATE_PAGE, classify_page, has_ink
+
+HEIGHT, WIDTH = 1100, 850
+
+
+def page():
+    return np.full((HEIGHT, WIDTH, 3), 250, np.uint8)
+
+
+def write(image, text, x, y, scale=0.8):
+    cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2)
+
+
+def add_plate(image):
+    # A photograph: smooth mid-tones filling the middle of the page.
+    ramp = np.linspace(70, 200, 600).astype(np.uint8)
+    image[250:850, 125:725] = np.tile(ramp, (600, 1))[:, :, None]
+
+
+def test_blank_page():
+    assert classify_page(page()) == BLANK_PAGE
+
+
+def test_bleed_through_is_still_blank():
+    image = page()
+    image[300:800, 100:750] = 215
+    assert classify_page(image) == BLANK_PAGE
+
+
+def test_page_with_only_its_number():
+    image = page()
+    write(image, "12", 410, 1030)
+    assert has_ink(image)
+    assert classify_page(image) is None
+
+
+def test_text_page():
+    image = page()
+    for y in range(200, 900, 40):
+        write(image, "The quick brown fox jumps over the lazy dog", 80, y)
+    assert classify_page(image) is None
+
+
+def test_plate():
+    image = page()
+    add_plate(image)
+    assert classify_page(image) == PLATE_PAGE
+
+
+def test_plate_with_a_caption_in_the_margin():
+    image = page()
+    add_plate(image)
+    write(image, "Plate IV. The harbour", 250, 1040)
+    assert classify_page(image) is None
+
+
+def test_nothing_to_classify():
+    assert classify_page(None) is None
+    assert classify_page(np.zeros((0, 0, 3), np.uint8)) is None
@@ -0,0 +1,72 @@
+import re
+
+import fitz  # PyMuPDF
+import pytest
+
+from pipeline import is_page_number
+from text_layer import NUMBER_LINE, ROMAN_NUMERAL, explicit_labels, read_page
+
+
+@pytest.mark.parametrize("text", ["i", "iv", "xiv", "XLII", "mcmxc", "lx", "cd"])
+def test_well_formed_roman_numerals(text):
+    assert re.fullmatch(ROMAN_NUMERAL, text, re.IGNORECASE)
+
+
+@pytest.mark.parametrize("text", ["l", "c", "d", "m", "ll", "dd", "vv", "iiii", "ic", "duction"])
+def test_malformed_roman_numerals_and_lone_letters(text):
+    assert not re.fullmatch(ROMAN_NUMERAL, text, re.IGNORECASE)
+    assert not is_page_number(text)
+
+
+@pytest.mark.parametrize("line, number", [("12", "12"), ("- 12 -", "12"), ("Page 7", "7"), ("xiv", "xiv"),
+                                          ("[IX]", "IX")])
+def test_number_line(line, number):
+    assert NUMBER_LINE.match(line).group(1) == number
+
+
+@pytest.mark.parametrize("line", ["Introduction", "duction", "l", "12 Chapter One", "Page", "12345"])
+def test_number_line_rejects(line):
+    assert NUMBER_LINE.match(line) is None
+
+
+def new_page(doc, footer=None, body=()):
+    page = doc.new_page(width=595, height=842)
+    for y, text in body:
+        page.insert_text((72, y), text, fontsize=14)
+    if footer is not None:
+        page.insert_text((290, 820), footer, fontsize=11)
+    return page
+
+
+def test_read_page_ignores_words_straddling_the_band():
+    # "Introduction" crosses the bottom band's edge (842 * 0.88 = 741).
+    with fitz.open() as doc:
+        page = new_page(doc, body=[(746, "Introduction")])
+        assert read_page(page, explicit_labels(doc)) is None
+
+        page = new_page(doc, footer="12", body=[(746, "Introduction")])
+        number, box, path = read_page(page, explicit_labels(doc))
+        assert (number, path) == ("12", "margin_text")
+        assert box[1] >= 741
+
+
+def test_default_labels_are_not_explicit():
+    with fitz.open() as doc:
+        new_page(doc)
+        doc.set_page_labels([{'startpage': 0, 'prefix': '', 'style': 'D', 'firstpagenum': 1}])
+        assert not explicit_labels(doc)
+
+
+def test_explicit_label_needs_a_margin_number():
+    with fitz.open() as doc:
+        new_page(doc)
+        new_page(doc, footer="ii")
+        new_page(doc, footer="9")
+        doc.set_page_labels([{'startpage': 0, 'prefix': '', 'style': 'r', 'firstpagenum': 1}])
+        labels_explicit = explicit_labels(doc)
+        assert labels_explicit
+
+        # An image-only scan: the label alone is not trusted.
+        assert read_page(doc[0], labels_explicit) is None
+        assert read_page(doc[1], labels_explicit)[0::2] == ("ii", "page_label")
+        assert read_page(doc[2], labels_explicit) is None
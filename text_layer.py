@@ -0,0 +1,94 @@
+import re
+
+
+# Share of the page height searched for a printed number at the top and the
+# bottom, as in the rasterizers' margin-band mode.
+MARGIN_FRACTION = 0.12
+# A well-formed roman numeral (case-insensitive). A lone l, c, d or m is
+# left out: it is far more often a misread 1 or a fragment of a word than
+# page 50, 100, 500 or 1000.
+ROMAN_NUMERAL = r'(?![lcdm](?![a-z]))(?=[ivxlcdm])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})'
+# A header/footer line holding nothing but a page number: "12", "- 12 -",
+# "Page 12", "xiv".
+NUMBER_LINE = re.compile(r'^[\W_]*(?:page\s+)?(\d{1,4}|' + ROMAN_NUMERAL + r')[\W_]*$', re.IGNORECASE)
+DEFAULT_LABELS = [{'startpage': 0, 'prefix': '', 'style': 'D', 'firstpagenum': 1}]
+
+
+def explicit_labels(doc):
+    """True when the PDF's /PageLabels say more than 'pages count from 1'.
+
+    Many producers write that default for every file, so it says nothing
+    about the printed numbers; roman front matter, offsets or prefixes do.
+    """
+    rules = doc.get_page_labels()
+    return bool(rules) and [{key: rule.get(key) for key in DEFAULT_LABELS[0]} for rule in rules] != DEFAULT_LABELS
+
+
+def margin_numbers(page, margin_fraction=MARGIN_FRACTION):
+    """(number, box) for each text line in the header and footer bands that is just a page number.
+
+    ``box`` is the line's bounding box in PDF points. Only lines lying
+    entirely inside a band count: clipping would cut the body text that
+    crosses the band edge into fragments that look like numerals.
+    """
+    rect = page.rect
+    band = rect.height * margin_fraction
+    lines = {}
+    for x0, y0, x1, y1, word, block, line, _ in page.get_text('words'):
+        key = (block, line)
+        if key in lines:
+            text, box = lines[key]
+            lines[key] = (text + ' ' + word, [min(box[0], x0), min(box[1], y0), max(box[2], x1), max(box[3], y1)])
+        else:
+            lines[key] = (word, [x0, y0, x1, y1])
+    numbers = []
+    for text, box in lines.values():
+        if not (box[3] <= rect.y0 + band or box[1] >= rect.y1 - band):
+            continue
+        match = NUMBER_LINE.match(text.strip())
+        if match:
+            number = match.group(1)
+            numbers.append((str(int(number)) if number.isdigit() else number.lower(), box))
+    return numbers
+
+
+def read_page(page, labels_explicit):
+    """(page_number, box, path) from the text layer of a fitz page, or None.
+
+    ``path`` is 'page_label' when an explicit /PageLabels entry decided it
+    and 'margin_text' when a lone number in the margins did. An explicit
+    label is only trusted when a margin number agrees with it: scanning
+    software writes labels as a plain sequence whatever the pages say. A
+    default label only breaks ties between several margin numbers.
+    """
+    label = page.get_label()
+    numbers = margin_numbers(page)
+    if label:
+        matching = [box for number, box in numbers if number == label.lower()]
+        if labels_explicit:
+            return (label, matching[0], 'page_label') if matching else None
+        if len(numbers) > 1 and matching:
+            return label, matching[0], 'margin_text'
+    if len(numbers) == 1:
+        return numbers[0][0], numbers[0][1], 'margin_text'
+    return None
+
+
+def read_text_layer(pdf_path, page_nums):
+    """{page_num: (page_number, box, path)} for the pages of ``page_nums`` the text layer answers.
+
+    Pages with no text, or with no single clear candidate, are left out
+    for the vision pipeline. Unreadable files give {}.
+    """
+    import fitz  # PyMuPDF
+    try:
+        with fitz.open(pdf_path) as doc:
+            labels_explicit = explicit_labels(doc)
+            found = {}
+            for page_num in page_nums:
+                answer = read_page(doc[page_num], labels_explicit)
+                if answer is not None:
+                    found[page_num] = answer
+            return found
+    except Exception:
+        return {}